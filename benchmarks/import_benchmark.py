@@ -0,0 +1,60 @@
+"""Import Time Benchmark
+
+Measures the time of importing the modules that dependency_graph.e imports when it is loaded to Specman,
+compared to the time of importing the rendering backend, each in a new Python interpreter.
+It also checks that the core does not import the heavy rendering libraries, and exits with an error if it does.
+
+Usage:
+    python benchmarks/import_benchmark.py [--repeat 5]
+"""
+import subprocess
+import argparse
+import statistics
+import json
+import sys
+import os
+
+
+###### CONSTANTS ######
+
+PYTHON_FILES_FOLDER = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python files")
+CORE_MODULES = ["create_graph", "render_worker", "reachability"] # The modules imported by dependency_graph.e
+BACKEND_MODULES = ["graph_aux"]
+HEAVY_MODULES = ["plotly", "networkx", "numpy", "scipy", "packaging"]
+IMPORT_SCRIPT = """
+import time, sys, json
+start = time.perf_counter()
+for name in %r:
+    __import__(name)
+print(json.dumps({"seconds": time.perf_counter() - start, "heavy": [name for name in %r if name in sys.modules]}))
+"""
+
+#######################
+
+
+def time_import(module_names, repeat):
+    """Returns the median import time in seconds of the modules in a new interpreter, and the heavy modules they imported"""
+    times = []
+    for i in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT % (module_names, HEAVY_MODULES)], cwd=PYTHON_FILES_FOLDER,
+                                stdout=subprocess.PIPE, check=True, universal_newlines=True).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result["seconds"])
+    return (statistics.median(times), result["heavy"])
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5, help="The amount of runs per measurement, the median is reported")
+    args = parser.parse_args()
+
+    (core_time, core_heavy) = time_import(CORE_MODULES, args.repeat)
+    (backend_time, backend_heavy) = time_import(CORE_MODULES + BACKEND_MODULES, args.repeat)
+    print("%-40s%10.3fs   heavy modules: %s" % ("core (" + ", ".join(CORE_MODULES) + ")", core_time, ", ".join(core_heavy) or "none"))
+    print("%-40s%10.3fs   heavy modules: %s" % ("core and rendering backend", backend_time, ", ".join(backend_heavy) or "none"))
+    if core_heavy:
+        print("Error: the core imports", ", ".join(core_heavy))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
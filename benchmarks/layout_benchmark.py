@@ -0,0 +1,62 @@
+"""Layout Engine Benchmark
+
+Measures how the runtime of every layout engine in layout_engines.py scales with the graph size,
+compared to the spring layout that was used for all graphs before.
+The graphs are random directed graphs with an average of EDGES_PER_VERTEX dependencies per module.
+
+Usage:
+    python benchmarks/layout_benchmark.py [--sizes 100 500 1000 ...] [--spring-limit 3000]
+"""
+import argparse
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python files"))
+
+import layout_engines
+import networkx as nx
+
+
+###### CONSTANTS ######
+
+DEFAULT_SIZES = [100, 500, 1000, 2000, 5000, 10000, 20000]
+EDGES_PER_VERTEX = 2
+
+#######################
+
+
+def time_engine(engine, G, repeat):
+    """Returns the best wall time in seconds of the engine on the graph"""
+    best = None
+    for i in range(repeat):
+        start = time.perf_counter()
+        engine(G, 0.6)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="The amounts of vertices to measure")
+    parser.add_argument("--spring-limit", type=int, default=3000, help="The largest graph measured with the O(V^2) spring layout")
+    parser.add_argument("--repeat", type=int, default=1, help="The amount of runs per measurement, the best is reported")
+    args = parser.parse_args()
+
+    engine_names = list(layout_engines.LAYOUT_ENGINES)
+    for name in engine_names: # Lazy imports are not part of the measurement
+        layout_engines.LAYOUT_ENGINES[name](nx.path_graph(3, create_using=nx.DiGraph), 0.6)
+    print("%10s" % "vertices" + "".join("%16s" % name for name in engine_names))
+    for size in args.sizes:
+        G = nx.gnm_random_graph(size, size * EDGES_PER_VERTEX, directed=True, seed=size)
+        row = "%10d" % size
+        for name in engine_names:
+            if name == "spring" and size > args.spring_limit:
+                row += "%16s" % "skipped"
+            else:
+                row += "%15.3fs" % time_engine(layout_engines.LAYOUT_ENGINES[name], G, args.repeat)
+        print(row, flush=True)
+
+
+if __name__ == "__main__":
+    main()
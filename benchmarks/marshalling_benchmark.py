@@ -0,0 +1,101 @@
+"""Marshalling Benchmark
+
+Compares the cost of passing a module graph from e to Python as lists of vertex and edge structs,
+and as parallel flat lists (the draw_graph_flat and graph_to_file_flat signatures).
+For each graph size, both representations are created the way the Specman conversion creates them
+(a Python object per vertex and edge, or a few flat lists), and are then built into a DependencyGraph.
+The wall time and the tracemalloc peak memory of the whole conversion are reported.
+
+The time of the e side conversion itself can only be measured in Specman, for example by comparing
+    sys.draw_graph(...) and sys.draw_graph_flat(...)
+with dependencies_query::flat_marshalling set to FALSE and TRUE.
+
+Usage:
+    python benchmarks/marshalling_benchmark.py [--sizes 1000 5000 ...] [--lines 5]
+"""
+import tracemalloc
+import argparse
+import random
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python files"))
+
+import graph_core as core
+
+
+###### CONSTANTS ######
+
+DEFAULT_SIZES = [1000, 5000, 10000, 20000]
+EDGES_PER_VERTEX = 3
+MODULES_PER_PACKAGE = 20
+
+#######################
+
+
+def create_raw_graph(size, lines_per_edge):
+    """Returns random vertex names, packages, and (source index, destination index, lines) edges, a line is a (dependent, dependee, module) triple"""
+    names = ["module_%d" % i for i in range(size)]
+    pkgs = ["package_%d" % (i // MODULES_PER_PACKAGE) for i in range(size)]
+    edges = []
+    for i in range(size * EDGES_PER_VERTEX):
+        (src, dst) = (random.randrange(size), random.randrange(size))
+        edges.append((src, dst, [(names[src], "%s.struct_%d" % (names[dst], j), names[dst]) for j in range(lines_per_edge)]))
+    return (names, pkgs, edges)
+
+def convert_objects(names, pkgs, edges):
+    vertices = []
+    for (name, pkg) in zip(names, pkgs):
+        vertices.append(core.vertex())
+        vertices[-1].name = name
+        vertices[-1].pkg = pkg
+    edge_objects = []
+    for (src, dst, lines) in edges:
+        edge_objects.append(core.edge())
+        edge_objects[-1].src_vertex = vertices[src]
+        edge_objects[-1].dst_vertex = vertices[dst]
+        edge_objects[-1].lines = []
+        for (dependent, dependee, module) in lines:
+            edge_objects[-1].lines.append(core.dependency_line())
+            edge_objects[-1].lines[-1].dependent = dependent
+            edge_objects[-1].lines[-1].dependee = dependee
+            edge_objects[-1].lines[-1].module = module
+    return core.DependencyGraph.from_objects(vertices, edge_objects, [])
+
+def convert_flat(names, pkgs, edges):
+    line_offsets = []
+    lines = []
+    for (src, dst, edge_lines) in edges:
+        line_offsets.append(len(lines) // 3)
+        for line in edge_lines:
+            lines.extend(line)
+    return core.DependencyGraph.from_columns(list(names), list(pkgs), [e[0] for e in edges], [e[1] for e in edges], line_offsets, lines, [], [])
+
+def measure(function, *args):
+    """Returns the wall time in seconds and the peak memory in MB of the function"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    function(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return (elapsed, peak / 2 ** 20)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="The amounts of modules to measure")
+    parser.add_argument("--lines", type=int, default=5, help="The amount of dependency info lines of every edge")
+    args = parser.parse_args()
+
+    random.seed(0)
+    print("%10s%10s%16s%16s%16s%16s" % ("modules", "edges", "objects time", "objects peak", "flat time", "flat peak"))
+    for size in args.sizes:
+        (names, pkgs, edges) = create_raw_graph(size, args.lines)
+        (objects_time, objects_peak) = measure(convert_objects, names, pkgs, edges)
+        (flat_time, flat_peak) = measure(convert_flat, names, pkgs, edges)
+        print("%10d%10d%15.3fs%14.1fMB%15.3fs%14.1fMB" % (size, len(edges), objects_time, objects_peak, flat_time, flat_peak), flush=True)
+
+
+if __name__ == "__main__":
+    main()
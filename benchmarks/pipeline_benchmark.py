@@ -0,0 +1,185 @@
+"""Rendering Pipeline Benchmark
+
+Measures the stages of draw_graph on synthetic dependency graphs, without a Specman session.
+The graphs are passed as the vertex and edge classes of graph_core, which stand in for the structs of the e file.
+A graph has packages of PACKAGE_SIZE modules, most dependencies are inside a package or to an earlier package,
+and a few go back and create cycles, like in a real environment.
+
+For every graph size, the wall time of every stage, the total wall time, the tracemalloc peak memory of the whole run
+and the size of the HTML file are recorded. The layout cache is disabled, so every run lays the graph out.
+The results are saved as JSON, and a previous results file can be passed to --compare to report the change of every stage.
+
+Usage:
+    python benchmarks/pipeline_benchmark.py [--sizes 100 500 ...] [--edges-per-module 3] [--import-ratio 0.5]
+                                            [--lines 3] [--output results.json] [--compare old_results.json] [--no-memory]
+"""
+from datetime import datetime as datetime
+import tracemalloc
+import functools
+import platform
+import argparse
+import tempfile
+import random
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "python files"))
+
+import create_graph
+import graph_aux as aux
+import graph_core as core
+import layout_cache
+import plotly
+import plotly.graph_objects as go
+import plotly.io as pio
+
+
+###### CONSTANTS ######
+
+DEFAULT_SIZES = [100, 500, 1000, 2000, 5000, 10000, 20000]
+PACKAGE_SIZE = 20
+INTERNAL_DEPENDENCY_SHARE = 0.7 # The share of dependencies between modules of the same package
+CYCLE_DEPENDENCY_SHARE = 0.02 # The share of dependencies from a module to a later module
+UNUSED_IMPORT_SHARE = 0.1 # The share of imports that are not also dependencies
+
+# The measured stages, as (stage name, object, attribute name)
+STAGES = [("create_pos", aux, "create_pos"),
+          ("create_middle_and_arrow_pos", aux, "create_middle_and_arrow_pos"),
+          ("create_node_traces", aux, "create_node_traces"),
+          ("create_shared_traces", aux, "create_shared_traces"),
+          ("create_layout", aux, "create_layout"),
+          ("go.Figure", go, "Figure"),
+          ("write_html", pio, "write_html")]
+
+#######################
+
+
+def create_synthetic_graph(vertex_amount, edge_amount, import_ratio, lines_per_edge, seed=0):
+    """Returns vertex, edge and imported edge objects of a random graph with a package structure"""
+    rand = random.Random(seed)
+    vertices = []
+    for i in range(vertex_amount):
+        vertices.append(core.vertex())
+        vertices[-1].name = "module_%d" % i
+        vertices[-1].pkg = "package_%d" % (i // PACKAGE_SIZE)
+
+    def create_edge(src, dst, lines):
+        current_edge = core.edge()
+        current_edge.src_vertex = vertices[src]
+        current_edge.dst_vertex = vertices[dst]
+        current_edge.lines = lines
+        return current_edge
+
+    edges = []
+    edge_pairs = []
+    for i in range(edge_amount if vertex_amount > 1 else 0):
+        src = rand.randrange(1, vertex_amount)
+        package_start = src - src % PACKAGE_SIZE
+        choice = rand.random()
+        if choice < CYCLE_DEPENDENCY_SHARE:
+            dst = rand.randrange(src, vertex_amount)
+        elif choice < CYCLE_DEPENDENCY_SHARE + INTERNAL_DEPENDENCY_SHARE and src > package_start:
+            dst = rand.randrange(package_start, src)
+        else:
+            dst = rand.randrange(0, src)
+        if dst != src:
+            edge_pairs.append((src, dst))
+            edges.append(create_edge(src, dst, [(vertices[src].name, "struct_%d.field_%d" % (j, rand.randrange(100)), vertices[dst].name)
+                                                for j in range(lines_per_edge)]))
+
+    imported = []
+    for i in range(int(len(edges) * import_ratio)):
+        if rand.random() < UNUSED_IMPORT_SHARE:
+            src = rand.randrange(1, vertex_amount)
+            imported.append(create_edge(src, rand.randrange(0, src), []))
+        else:
+            imported.append(create_edge(*edge_pairs[rand.randrange(len(edge_pairs))], []))
+    return (vertices, edges, imported)
+
+def timed(stage_times, name, function):
+    """Returns the function wrapped to add its wall time to stage_times[name]"""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            stage_times[name] = stage_times.get(name, 0.0) + time.perf_counter() - start
+    return wrapper
+
+def run_pipeline(vertices, edges, imported):
+    """Draws the graph once, and returns the wall time of every stage, the total wall time and the HTML file size"""
+    stage_times = {}
+    originals = [(owner, attribute, getattr(owner, attribute)) for (name, owner, attribute) in STAGES]
+    for (name, owner, attribute) in STAGES:
+        setattr(owner, attribute, timed(stage_times, name, getattr(owner, attribute)))
+    try:
+        start = time.perf_counter()
+        graph = timed(stage_times, "from_objects", core.DependencyGraph.from_objects)(vertices, edges, imported)
+        filename = create_graph.render_graph(graph, "benchmark", "modules", open_browser=False)
+        total = time.perf_counter() - start
+    finally:
+        for (owner, attribute, original) in originals:
+            setattr(owner, attribute, original)
+    return (stage_times, total, os.path.getsize(filename))
+
+def measure_peak_memory(vertices, edges, imported):
+    """Returns the tracemalloc peak memory in MB of drawing the graph once"""
+    tracemalloc.start()
+    create_graph.render_graph(core.DependencyGraph.from_objects(vertices, edges, imported), "benchmark", "modules", open_browser=False)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+def compare_results(results, old_path):
+    """Prints the ratio of every stage time to the time in a previous results file, for the graph sizes in both"""
+    with open(old_path) as f:
+        old_results = {result["modules"]: result for result in json.load(f)["results"]}
+    print("\nCompared to", old_path, "(new time / old time):")
+    for result in results:
+        old_result = old_results.get(result["modules"])
+        if old_result is None:
+            continue
+        ratios = ["%s %.2f" % (name, seconds / old_result["stages"][name]) for (name, seconds) in result["stages"].items()
+                  if old_result["stages"].get(name)]
+        print("%10d modules: total %.2f, " % (result["modules"], result["total"] / old_result["total"]) + ", ".join(ratios))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="The amounts of modules to measure")
+    parser.add_argument("--edges-per-module", type=float, default=3, help="The amount of dependencies per module")
+    parser.add_argument("--import-ratio", type=float, default=0.5, help="The amount of import dependencies per dependency")
+    parser.add_argument("--lines", type=int, default=3, help="The amount of dependency info lines of every dependency")
+    parser.add_argument("--output", default="pipeline_benchmark-" + datetime.now().strftime("%Y_%m_%d_%H_%M") + ".json", help="The results file")
+    parser.add_argument("--compare", help="A previous results file to compare to")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the second run of every size that measures the peak memory")
+    args = parser.parse_args()
+    output_path = os.path.abspath(args.output)
+
+    layout_cache.LAYOUT_CACHE_SIZE = 0
+    results = []
+    with tempfile.TemporaryDirectory() as work_folder:
+        os.chdir(work_folder) # The HTML files are written to HTML_FILE_FOLDER in the current directory
+        run_pipeline(*create_synthetic_graph(20, 40, args.import_ratio, args.lines)) # Lazy imports and plotly validators are not part of the measurement
+        for size in args.sizes:
+            (vertices, edges, imported) = create_synthetic_graph(size, int(size * args.edges_per_module), args.import_ratio, args.lines, seed=size)
+            (stage_times, total, html_size) = run_pipeline(vertices, edges, imported)
+            peak_memory = None if args.no_memory else measure_peak_memory(vertices, edges, imported)
+            results.append({"modules": size, "edges": len(edges), "imports": len(imported), "stages": stage_times, "total": total,
+                            "peak_memory_mb": peak_memory, "html_bytes": html_size})
+            print("%10d modules %8d edges: total %8.2fs, " % (size, len(edges), total) +
+                  ", ".join("%s %.2fs" % (name, seconds) for (name, seconds) in stage_times.items()) +
+                  ("" if peak_memory is None else ", peak %.1fMB" % peak_memory) + ", HTML %.1fMB" % (html_size / 2 ** 20), flush=True)
+
+    with open(output_path, 'w') as f:
+        json.dump({"created": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), "python": platform.python_version(), "plotly": plotly.__version__,
+                   "parameters": vars(args), "results": results}, f, indent=1)
+    print("The results have been written to", output_path)
+    if args.compare:
+        compare_results(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
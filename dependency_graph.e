@@ -6,32 +6,143 @@ struct vertex {
     %pkg : string;
 };
 
+//A dependency info line, "<dependent> depends on <dependee> from <module>" is only formatted in Python when it is displayed or exported
+struct dependency_line {
+    %dependent : string;
+    %dependee : string;
+    %module : string;
+};
+
 struct edge {
     %src_vertex : vertex;
     %dst_vertex : vertex;
-    %lines : list of string;
+    %lines : list of dependency_line;
+};
+
+//The graph as parallel flat lists, which are passed to Python much faster than lists of vertex and edge structs
+struct flat_graph {
+    names : list of string;
+    pkgs : list of string;
+    edge_src : list of int; //Indices in names
+    edge_dst : list of int;
+    line_offsets : list of int; //The index of the first dependency line of every edge, counted in dependency lines
+    lines : list of string; //The dependent, dependee and module of every dependency line, three strings per line
+    import_src : list of int;
+    import_dst : list of int;
 };
 
 
 extend sys {
 	@import_python(module_name="create_graph", python_name="draw_graph")
-    draw_graph(vertices : list of vertex, edges : list of edge, imported : list of edge, item_name : string, item_type : string, blacklist : list of string={}) is imported;
+    draw_graph(vertices : list of vertex, edges : list of edge, imported : list of edge, item_name : string, item_type : string, blacklist : list of string={}, open_browser : bool=TRUE, focus_hops : uint=0) is imported;
     
     @import_python(module_name="create_graph", python_name="graph_to_file")
     graph_to_file(vertices : list of vertex, edges : list of edge, imported : list of edge, item_name: string, item_type : string) is imported;
+    
+    @import_python(module_name="create_graph", python_name="draw_graph_flat")
+    draw_graph_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                    import_src : list of int, import_dst : list of int, item_name : string, item_type : string, blacklist : list of string={}, focus_hops : uint=0) is imported;
+    
+    @import_python(module_name="create_graph", python_name="graph_to_file_flat")
+    graph_to_file_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                       import_src : list of int, import_dst : list of int, item_name : string, item_type : string) is imported;
+    
+    @import_python(module_name="render_worker", python_name="draw_graph_async_flat")
+    draw_graph_async_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                          import_src : list of int, import_dst : list of int, item_name : string, item_type : string, blacklist : list of string={}, focus_hops : uint=0) : string is imported;
+    
+    @import_python(module_name="create_graph", python_name="package_graph")
+    package_graph(vertices : list of vertex, edges : list of edge, item_name : string, blacklist : list of string, to_file : bool, background : bool) is imported;
+    
+    @import_python(module_name="create_graph", python_name="package_graph_flat")
+    package_graph_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                       item_name : string, blacklist : list of string, to_file : bool, background : bool) is imported;
+    
+    @import_python(module_name="render_worker", python_name="draw_graph_async")
+    draw_graph_async(vertices : list of vertex, edges : list of edge, imported : list of edge, item_name : string, item_type : string, blacklist : list of string={}, focus_hops : uint=0) : string is imported;
+    
+    @import_python(module_name="render_worker", python_name="render_status")
+    render_status(job_id : string) : string is imported;
+    
+    @import_python(module_name="reachability", python_name="index_graph_flat")
+    index_graph_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                     import_src : list of int, import_dst : list of int, item_name : string) is imported;
+    
+    @import_python(module_name="reachability", python_name="is_reachable")
+    is_reachable(src : string, dst : string) : bool is imported;
+    
+    @import_python(module_name="reachability", python_name="get_dependents")
+    get_dependents(module_name : string) : list of string is imported;
+    
+    @import_python(module_name="reachability", python_name="get_dependees")
+    get_dependees(module_name : string) : list of string is imported;
+    
+    @import_python(module_name="reachability", python_name="get_shortest_path")
+    get_shortest_path(src : string, dst : string) : list of string is imported;
+    
+    @import_python(module_name="reachability", python_name="update_index")
+    update_index(module_name : string, dependee_names : list of string) is imported;
+    
+    @import_python(module_name="create_graph", python_name="batch_graph")
+    batch_graph(vertices : list of vertex, edges : list of edge, imported : list of edge, roots : list of string, item_type : string, to_file : bool) : list of string is imported;
+    
+    @import_python(module_name="create_graph", python_name="batch_graph_flat")
+    batch_graph_flat(names : list of string, pkgs : list of string, edge_src : list of int, edge_dst : list of int, line_offsets : list of int, lines : list of string,
+                     import_src : list of int, import_dst : list of int, roots : list of string, item_type : string, to_file : bool) : list of string is imported;
 };
 
 extend dependencies_query {
     
+    //When TRUE, module graphs are passed to Python as parallel flat lists instead of lists of vertex and edge structs
+    static flat_marshalling : bool = TRUE;
+    
     //Draws a graph of recursive dependencies of the given file/module
     // OPTIONS:
     //		to_file - When TRUE, writes the graph info to file. Otherwise, visual graph is displayed.
+    //		background - When TRUE, the visual graph is created by a background worker and the function returns immediately.
+    //		             The printed job id can be passed to graph_status. Only relevant if to_file is FALSE.
+    //		hops - When above 0, only the modules within this amount of dependencies from the given module, in either direction,
+    //		       are laid out and drawn, and the amount of pruned modules is reported. Only relevant if to_file is FALSE.
     
-    static module_graph(filename: string, to_file : bool = FALSE) is {
+    static module_graph(filename: string, to_file : bool = FALSE, background : bool = FALSE, hops : uint = 0) is {
+        var vertices : list (key: name) of vertex;
+        var edges : list of edge;
+        var imports : list of edge;
+        if collect_module_graph(filename, vertices, edges, imports) then {
+            if flat_marshalling {
+            	var flat : flat_graph = flatten_graph(vertices, edges, imports);
+            	if to_file {
+            		sys.graph_to_file_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, flat.import_src, flat.import_dst, filename, "modules");
+            	}
+            	else if background {
+            		var job_id : string = sys.draw_graph_async_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, flat.import_src, flat.import_dst, filename, "modules", {}, hops);
+            	}
+            	else {
+            		sys.draw_graph_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, flat.import_src, flat.import_dst, filename, "modules", {}, hops);
+            	};
+            }
+            else if to_file {
+            	sys.graph_to_file(vertices.as_a(list of vertex), edges, imports, filename, "modules");
+            }
+            else if background {
+            	var job_id : string = sys.draw_graph_async(vertices.as_a(list of vertex), edges, imports, filename, "modules", {}, hops);
+            }
+            else {
+            	sys.draw_graph(vertices.as_a(list of vertex), edges, imports, filename, "modules", {}, TRUE, hops);
+            };
+        }
+        else {
+        	out("The module may not be loaded.");
+        }
+        
+    };
+
+    //Collects the vertices of all the interesting modules, and the imports and recursive dependencies of the given file/module
+    //into the given lists. Returns FALSE if the file/module has no dependencies.
+    static collect_module_graph(filename : string, vertices : list (key: name) of vertex, edges : list of edge, imports : list of edge) : bool is {
         var dep_from: list(key: the_module) of module_dependencies = dependencies_query::find_module_dependencies_recursively(filename);       
         var dep_to: list (key: the_module) of module_dependencies = get_all_dependencies_to(filename); 
         var all_modules: list of rf_module = dependencies_query::get_interesting_modules();
-        var vertices : list (key: name) of vertex;
         for each (module) in all_modules {
         	if module.get_name() != "dependency_graph" and module.get_name() != "e_util_dependency_util" {
 	        	var current_vertex : vertex = new with {
@@ -41,8 +152,6 @@ extend dependencies_query {
 	        	vertices.push(current_vertex);
         	};
         };
-        var edges : list of edge;
-        var imports : list of edge;
         if not dep_from.is_empty() or not dep_to.is_empty() then {
             for each (dep) in dep_from {
             	var module_name: string = dep.the_module.get_name();
@@ -85,7 +194,7 @@ extend dependencies_query {
 			                    var current_edge : edge = new with {
 				                    .src_vertex = current_src_vertex; //source vertex
 				                    .dst_vertex = current_dst_vertex; //destination vertex
-				                    .lines = get_dependency_names(dependent_module_name, dependee_module_name);
+				                    .lines = get_dependency_lines(dependent_module_name, dependee_module_name);
 			                    };
 			                    edges.push(current_edge);
 		                    }
@@ -114,7 +223,7 @@ extend dependencies_query {
 					                var current_edge : edge = new with {
 					                	.src_vertex = current_src_vertex;
 					                	.dst_vertex = current_dst_vertex;
-					                	.lines = get_dependency_names(dependent_module_name, dependee_module_name);
+					                	.lines = get_dependency_lines(dependent_module_name, dependee_module_name);
 					                };
 					                edges.push(current_edge);
 			            		};
@@ -129,17 +238,89 @@ extend dependencies_query {
 	                };
                 }
             };
-            if to_file {
-            	sys.graph_to_file(vertices.as_a(list of vertex), edges, imports, filename, "modules");
+            result = TRUE;
+        };
+    };
+    
+    //Writes a graph for every one of the given modules or packages, such as the top level modules of a nightly report
+    //The dependencies of all of the modules are collected once, and the union graph is laid out once,
+    //so a module has the same position in all of the graphs. The files are written in parallel by Python worker processes.
+    // OPTIONS:
+    //		item_type - "modules" when the roots are module names, "packages" when they are package names
+    //		to_file - When TRUE, writes the graph info of every root to file. Otherwise, an HTML file is written for every root.
+    static batch_graph(roots : list of string, item_type : string = "modules", to_file : bool = FALSE) is {
+        var vertices : list (key: name) of vertex;
+        var edges : list of edge;
+        var imports : list of edge;
+        if collect_module_graph("*", vertices, edges, imports) then {
+            var paths : list of string;
+            if flat_marshalling {
+            	var flat : flat_graph = flatten_graph(vertices, edges, imports);
+            	paths = sys.batch_graph_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, flat.import_src, flat.import_dst, roots, item_type, to_file);
             }
             else {
-            	sys.draw_graph(vertices.as_a(list of vertex), edges, imports, filename, "modules");
+            	paths = sys.batch_graph(vertices.as_a(list of vertex), edges, imports, roots, item_type, to_file);
+            };
+            for each (path) in paths {
+            	out(path);
             };
         }
         else {
-        	out("The module may not be loaded.");
+        	out("No modules are loaded.");
+        };
+    };
+    
+    //Writes the graph info of all of the modules to file, and the reachability index next to it
+    //The index answers the queries below without querying the dependencies again. It is loaded from the text folder when needed.
+    static reachability_index() is {
+        var vertices : list (key: name) of vertex;
+        var edges : list of edge;
+        var imports : list of edge;
+        if collect_module_graph("*", vertices, edges, imports) then {
+            var flat : flat_graph = flatten_graph(vertices, edges, imports);
+            sys.index_graph_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, flat.import_src, flat.import_dst, "all");
         }
-        
+        else {
+        	out("No modules are loaded.");
+        };
+    };
+    
+    //Returns TRUE if the src module depends on the dst module, directly or indirectly (reachability index query)
+    static depends_on(src : string, dst : string) : bool is {
+        result = sys.is_reachable(src, dst);
+    };
+    
+    //Returns the modules that depend on the given module, directly or indirectly (reachability index query)
+    static dependents_of(module_name : string) : list of string is {
+        result = sys.get_dependents(module_name);
+    };
+    
+    //Returns the modules that the given module depends on, directly or indirectly (reachability index query)
+    static dependees_of(module_name : string) : list of string is {
+        result = sys.get_dependees(module_name);
+    };
+    
+    //Returns the modules of a shortest path of dependencies from the src module to the dst module, or an empty list (reachability index query)
+    static dependency_path(src : string, dst : string) : list of string is {
+        result = sys.get_shortest_path(src, dst);
+    };
+    
+    //Updates the dependencies of the given module in the reachability index, after the module was changed and reloaded
+    static update_reachability_index(module_name : string) is {
+        var module : rf_module = rf_manager.get_module_by_name(module_name);
+        if module != NULL then {
+            var dep_from : list(key: the_module) of module_dependencies = dependencies_query::find_module_dependencies_recursively(module_name);
+            var dependee_names : list of string;
+            if dep_from.key_exists(module) {
+            	for each (dependee) in dep_from.key(module).all_deps {
+            		dependee_names.add(dependee.get_name());
+            	};
+            };
+            sys.update_index(module_name, dependee_names);
+        }
+        else {
+        	out("The module ", module_name, " was not found");
+        };
     };
     
     //Returns a list of module dependencies for all modules that depend on the given files, recursively
@@ -178,65 +359,49 @@ extend dependencies_query {
     // OPTIONS:
     //		to_file - When TRUE, writes the graph info to file. Otherwise, visual graph is displayed.
     //		blacklist - Enables hiding/displaying given list of packages in the graph. Only relevant if to_file is FALSE.
-    static package_graph(my_package : string, blacklist : list of string = {}, to_file : bool = FALSE) is {   
+    //		background - When TRUE, the visual graph is created by a background worker and the function returns immediately.
+    //		             The printed job id can be passed to graph_status. Only relevant if to_file is FALSE.
+    static package_graph(my_package : string, blacklist : list of string = {}, to_file : bool = FALSE, background : bool = FALSE) is {   
         var the_package : rf_package = rf_manager.get_package_by_name(my_package);
         if the_package != NULL then {
 	        var package_modules : list of rf_module = the_package.get_modules(); //All modules to be checked
-	        var vertices : list (key: name) of vertex;
-	        var edges : list of edge;
+	        //The recursive dependencies of a module that was already reached are already collected, so it is skipped
+	        var all_deps : list(key: the_module) of module_dependencies;
 	        for each (module) in package_modules {
-	        	var module_name : string = module.get_name();
-	        	var dep_from: list(key: the_module) of module_dependencies = dependencies_query::find_module_dependencies_recursively(module_name);
-	    		for each (dep) in dep_from {
-	    			var dependent_name : string = dep.the_module.get_name();
-	    			var dependent_pkg_name : string = dep.the_module.get_package().get_name();
-	    			if not vertices.key_exists(dependent_pkg_name) {
-	    				var current_vertex : vertex = new with {
-		    				.name = dependent_pkg_name;
-		    				.pkg = dependent_pkg_name;
+	        	if not all_deps.key_exists(module) {
+		        	var dep_from: list(key: the_module) of module_dependencies = dependencies_query::find_module_dependencies_recursively(module.get_name());
+		    		for each (dep) in dep_from {
+		    			if not all_deps.key_exists(dep.the_module) {
+		    				all_deps.add(dep);
 		    			};
-		    			vertices.push(current_vertex);
-	    			};
-	    			for each (dependee) in dep.all_deps {
-	    				var dependee_name : string = dependee.get_name();
-	    				var dependee_pkg_name : string = dependee.get_package().get_name();
-						if not vertices.key_exists(dependee_pkg_name){
-							var current_vertex : vertex = new with {
-								.name = dependee_pkg_name;
-								.pkg = dependee_pkg_name;
-							};
-	    					vertices.push(current_vertex);
-						};
-						var dependent_vertex : vertex = vertices.key(dependent_pkg_name);
-						var dependee_vertex : vertex = vertices.key(dependee_pkg_name);
-						if dependent_vertex != NULL and dependee_vertex != NULL then {
-							if dependent_vertex != dependee_vertex {
-		    					var existing_edge : edge = edges.first(.src_vertex == dependent_vertex and .dst_vertex == dependee_vertex);
-		    					if existing_edge == NULL {
-		        					var current_edge : edge = new with {
-			        					.src_vertex = dependent_vertex;
-			        					.dst_vertex = dependee_vertex;
-			        					.lines = get_dependency_names(dependent_name, dependee_name);
-		        					};
-		        					edges.push(current_edge);
-		        				}
-		        				else {
-		        					existing_edge.lines.add(get_dependency_names(dependent_name, dependee_name));
-		        				};
-							};
-						}
-						else {
-							out("One of the following vertices was not added: ", dependent_pkg_name, " ", dependee_pkg_name);
-						};
-	    			};
+		    		};
 	        	};
 	        };
-	        if to_file {
-                    sys.graph_to_file(vertices.as_a(list of vertex), edges, {}, my_package, "packages");
-                }
-              else {
-                    sys.draw_graph(vertices.as_a(list of vertex), edges, {}, my_package, "packages", blacklist);
-                };
+	        //Module vertices and the dependencies between modules of different packages, rolled up to packages in Python
+	        var vertices : list (key: name) of vertex;
+	        var edges : list of edge;
+	        for each (dep) in all_deps {
+	        	var dependent_vertex : vertex = get_module_vertex(vertices, dep.the_module);
+    			for each (dependee) in dep.all_deps {
+    				var dependee_vertex : vertex = get_module_vertex(vertices, dependee);
+    				if dependent_vertex.pkg != dependee_vertex.pkg {
+    					var current_edge : edge = new with {
+        					.src_vertex = dependent_vertex;
+        					.dst_vertex = dependee_vertex;
+        					.lines = get_dependency_lines(dependent_vertex.name, dependee_vertex.name);
+    					};
+    					edges.push(current_edge);
+    				};
+    			};
+	        };
+	        if flat_marshalling {
+	        	var no_imports : list of edge;
+	        	var flat : flat_graph = flatten_graph(vertices, edges, no_imports);
+	        	sys.package_graph_flat(flat.names, flat.pkgs, flat.edge_src, flat.edge_dst, flat.line_offsets, flat.lines, my_package, blacklist, to_file, background);
+	        }
+	        else {
+	        	sys.package_graph(vertices.as_a(list of vertex), edges, my_package, blacklist, to_file, background);
+	        };
         }
         else {
         	out("The package ", my_package, " was not found");
@@ -247,12 +412,59 @@ extend dependencies_query {
     
     
     
-    static get_dependency_names(dependent_module : string, dependee_module : string) : list of string is {
+    //Prints the status of a graph that is created in the background
+    //The status is one of "queued", "running", "done <html file path>", "failed <error>" or "unknown"
+    static graph_status(job_id : string) is {
+        out("Graph job ", job_id, ": ", sys.render_status(job_id));
+    };
+    
+    //Returns the graph as parallel flat lists, the vertex indices are their indices in the vertices list
+    static flatten_graph(vertices : list (key: name) of vertex, edges : list of edge, imports : list of edge) : flat_graph is {
+    	result = new;
+    	for each (current_vertex) in vertices {
+    		result.names.add(current_vertex.name);
+    		result.pkgs.add(current_vertex.pkg);
+    	};
+    	for each (current_edge) in edges {
+    		result.edge_src.add(vertices.key_index(current_edge.src_vertex.name));
+    		result.edge_dst.add(vertices.key_index(current_edge.dst_vertex.name));
+    		result.line_offsets.add(result.lines.size() / 3);
+    		for each (line) in current_edge.lines {
+    			result.lines.add(line.dependent);
+    			result.lines.add(line.dependee);
+    			result.lines.add(line.module);
+    		};
+    	};
+    	for each (current_import) in imports {
+    		result.import_src.add(vertices.key_index(current_import.src_vertex.name));
+    		result.import_dst.add(vertices.key_index(current_import.dst_vertex.name));
+    	};
+    };
+    
+    //Returns the vertex of the given module, and creates it if it does not exist
+    static get_module_vertex(vertices : list (key: name) of vertex, module : rf_module) : vertex is {
+    	result = vertices.key(module.get_name());
+    	if result == NULL {
+    		result = new with {
+    			.name = module.get_name();
+    			.pkg = module.get_package().get_name();
+    		};
+    		vertices.push(result);
+    	};
+    };
+    
+    //Returns the direct dependencies between two modules as dependency lines, which are deduplicated, limited and formatted in Python
+    static get_dependency_lines(dependent_module : string, dependee_module : string) : list of dependency_line is {
         var all_dep: list of dependency_info = dependencies_query::find_all_dependencies_by_pattern(module, dependent_module, module, dependee_module);
         if all_dep is not empty then {
+            var dependent_name : string = all_dep[0].main_dependent.get_element_name();
+            var module_name : string = all_dep[0].main_dependee.get_element_name();
             for each (dep) in all_dep[0].direct_dependencies {
-                var dep_string : string = appendf("%s depends on %s from %s", all_dep[0].main_dependent.get_element_name(), dep.dependee.get_element_name(), all_dep[0].main_dependee.get_element_name());
-                result.add(dep_string);
+                result.add(new dependency_line with {
+                    .dependent = dependent_name;
+                    .dependee = dep.dependee.get_element_name();
+                    .module = module_name;
+                });
             };
 
         };
@@ -0,0 +1,52 @@
+"""Dependency Graph Backends
+
+A registry of the modules that render and lay out graphs, which are imported only when they are first used.
+Loading the tool from Specman only imports its light core, so functions that do not draw a graph,
+such as graph_to_file, do not pay for importing plotly, networkx and numpy.
+
+This file contains the following classes:
+    * LazyBackend - A module that is imported when one of its attributes is first used
+
+This file contains the following functions:
+    * get_backend - Returns the registered backend, without importing it
+"""
+import importlib
+
+
+###### CONSTANTS ######
+
+# The backends by their role, and the module that is imported for every role
+BACKENDS = {"render": "graph_aux",            # Traces, layout and positions, imports plotly, networkx and numpy
+            "figure": "plotly.graph_objects",
+            "html": "plotly.io",
+            "arrays": "numpy"}                 # The reachability index
+
+#######################
+
+
+class LazyBackend:
+    """ A module that is imported when one of its attributes is first used
+    Class attributes:
+    module_name - The name of the imported module
+    module - The imported module, or None before its first use
+    """
+    def __init__(self, module_name):
+        self.module_name = module_name
+        self.module = None
+
+    def __getattr__(self, attribute): # Only called for the attributes of the module
+        if self.module is None:
+            self.module = importlib.import_module(self.module_name)
+        return getattr(self.module, attribute)
+
+    def is_loaded(self):
+        return self.module is not None
+
+
+registered_backends = {}
+
+def get_backend(role):
+    """Returns the backend registered for the role in BACKENDS, it is imported when one of its attributes is first used"""
+    if role not in registered_backends:
+        registered_backends[role] = LazyBackend(BACKENDS[role])
+    return registered_backends[role]
@@ -8,10 +8,21 @@ This file is required to be in the same folder as:
 """
 
 TEXT_FILE_FOLDER = r"dependency-graph-text/" # The file path to save the graph info, can be absolute or relative (to_file option)
-TEXT_FILE_EXTENSION = r".txt" # The extension for the file that saves the graph info (to_file option)
+TEXT_FILE_FORMAT = "structured" # "structured" - JSON lines that can be loaded back with graph_io.read_graph, "legacy" - Python lists as text (to_file option)
+TEXT_FILE_EXTENSION = r".txt" # The extension for the file that saves the graph info in the legacy format (to_file option)
+STRUCTURED_FILE_EXTENSION = r".jsonl" # The extension for the file that saves the graph info in the structured format (to_file option)
+TEXT_FILE_COMPRESS = False # When True, the structured file is compressed with gzip and ".gz" is added to its extension (to_file option)
 
 HTML_FILE_FOLDER = r"dependency-graph-HTML/" # The file path to save the visual graph, can be absolute or relative
 
+LAYOUT_CACHE_FOLDER = r"dependency-graph-cache/" # The file path to save the graph layouts, can be absolute or relative
+LAYOUT_CACHE_SIZE = 50 # The maximum amount of saved layouts, the least recently used are removed first. 0 disables the cache
+LAYOUT_CACHE_CANDIDATES = 5 # The amount of recently used layouts that are checked as a starting point for a changed graph
+
+LAYOUT_ENGINE = "auto" # One of "auto", "spring", "sparse_force", "hierarchical". "auto" selects the engine by the amount of vertices
+SPARSE_LAYOUT_THRESHOLD = 500 # With "auto", graphs with more vertices use the sparse force layout instead of the spring layout
+HIERARCHICAL_LAYOUT_THRESHOLD = 5000 # With "auto", graphs with more vertices use the linear time hierarchical layout
+
 ARROW_COLOR = "rgb(169, 169, 169)"
 ARROW_SIZE = 3
 ARROW_WIDTH = 1
@@ -22,7 +33,34 @@ ERROR_ARROW_WIDTH = 3
 
 ARROW_HOVER_DIAMETER = 25
 
+DIFF_ADDED_COLOR = "green" # The color of added modules and dependencies in a graph diff
+DIFF_REMOVED_COLOR = "orange" # The color of removed modules and dependencies in a graph diff
+
+BATCHED_EDGES_THRESHOLD = 500 # Above this amount of edges, the edges are drawn as a few batched traces instead of an annotation per edge
+ARROW_HEAD_SIZE = 10 # The arrowhead marker size when the edges are batched
+USE_WEBGL = False # When True, the lines of batched edges are drawn with WebGL (Scattergl) traces, the arrowheads are not
+
+COMPACT_HTML = False # When True, the HTML files share one plotly.js copy in HTML_FILE_FOLDER and the toggle reuses one set of traces
+COMPACT_FLOAT_DIGITS = 4 # The amount of decimal digits of the positions written to compact HTML files
+
+LAZY_DETAIL = False # When True, edges show a short summary on hover, and all of their dependency info lines when clicked
+LAZY_DETAIL_SUMMARY_LINES = 1 # The amount of dependency info lines in the hover summary of an edge (LAZY_DETAIL option)
+LAZY_DETAIL_EXTENSION = r".details.js" # The extension of the compressed file next to the HTML file that holds all of the lines (LAZY_DETAIL option)
+
+LEVEL_OF_DETAIL = False # When True, a modules graph shows a vertex per package, and the modules of a package are drawn when it is clicked
+LEVEL_OF_DETAIL_RADIUS = 0.45 # The radius of the drawn modules of a package, relative to the distance to the nearest package (LEVEL_OF_DETAIL option)
+LEVEL_OF_DETAIL_CACHE_THRESHOLD = 50 # The layouts of packages with at least this amount of modules are cached (LEVEL_OF_DETAIL option)
+LEVEL_OF_DETAIL_MAX_EDGE_WIDTH = 8 # The width of the heaviest dependencies between packages, the width grows with the log of the weight (LEVEL_OF_DETAIL option)
+
+CONDENSE_CYCLES = False # When True, every cycle of dependencies is drawn as a single vertex that lists its members on hover
+TRANSITIVE_REDUCTION = False # When True, dependencies that are implied by other paths of dependencies are removed
+CYCLE_DEPENDENCY_LINE_CAP = 100 # The maximum amount of unique dependency info lines kept for a dependency between two condensed cycles
+
+REACHABILITY_INDEX = False # When True, a reachability index is saved next to the text file of every module graph of all of the modules (to_file option)
+REACHABILITY_INDEX_EXTENSION = r".reach.npz" # The extension of the reachability index file (REACHABILITY_INDEX option)
+
 DEPENDENCY_INFO_LINE_AMOUNT = 9
+PACKAGE_DEPENDENCY_LINE_CAP = 100 # The maximum amount of unique dependency info lines kept for a dependency between two packages
 BASE_NODE_SIZE = 11
 
 ADDITIONAL_INFO_X = 0.5 # A decimal number relative to the graph plot, 0 is the left of the plot, 1 is the right
@@ -32,4 +70,15 @@ TEXT_SIZE = 17
 TOGGLE_OPTION_X = 0 # A decimal number relative to the graph plot, 0 is the left of the plot, 1 is the right
 TOGGLE_OPTION_Y = 1.1 # A decimal number relative to the graph plot, 0 is the bottom of the plot, 1 is the top
 
+ASYNC_QUEUE_FOLDER = r"dependency-graph-jobs/" # The file path of the graphs waiting for the background worker (async option)
+ASYNC_WORKER_PYTHON = "python3" # The Python interpreter that runs the background worker (async option)
+ASYNC_OPEN_BROWSER = True # When True, the background worker opens every graph it created in the browser (async option)
+ASYNC_LOG_FILE = r"render-worker.log" # The file in HTML_FILE_FOLDER to which the background worker failures are written (async option)
+ASYNC_STATUS_MAX_AGE = 24 # The amount of hours the status of a queued graph is kept, older statuses are removed by the background worker (async option)
+
+BATCH_WORKERS = 0 # The amount of processes that write the files of a batch, 0 uses a process per CPU. The processes run ASYNC_WORKER_PYTHON (batch option)
+
+PROFILE_PIPELINE = False # When True, the time and peak memory of every stage are printed and logged. Also enabled by the DEPENDENCY_GRAPH_PROFILE environment variable
+PROFILE_LOG_FILE = r"pipeline-profile.jsonl" # The file in the folder of the created file to which the profile of every graph is appended (PROFILE_PIPELINE option)
+
 FALLBACK_BROWSER = "firefox" # The browser that will open the HTMl file if the default is not defined or cannot open the file
\ No newline at end of file
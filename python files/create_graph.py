@@ -5,63 +5,68 @@ This tool allows the user to create a visual display of dependencies in their en
 It is assumed that this tool is called from the matching E file dependency_graph.e
 
 This tool requires Python version >= 3.2 and the following modules be installed:
-    * packaging.version
     * plotly.graph_objects
-    * plotly.offline
+    * plotly.io
     * subprocess
     * platform
     * networkx
     * datetime
-    * random
+    * numpy
     * shutil
+    * multiprocessing
+    * concurrent.futures
     * os
 
 This tool requires the following files in the same folder:
     * graph_aux.py
+    * backends.py
+    * graph_core.py
+    * graph_io.py
+    * render_worker.py
+    * reachability.py
+    * profiling.py
+    * layout_engines.py
+    * layout_cache.py
     * config.py - The variables in this file may be modified and will affect the graph appearance and file
 
 This file contains the following functions:
     * graph_to_file - Creates a text file that contains the graph information in text format
     * draw_graph - Creates an html file that displays the graph visually
+    * graph_to_file_flat, draw_graph_flat - The same, with the graph passed as parallel flat lists
+    * package_graph - Rolls module dependencies up to a package graph, and writes it to file or displays it
+    * package_graph_flat - The same, with the module graph passed as parallel flat lists
+    * batch_graph, batch_graph_flat - Writes the graph files of a list of roots in parallel, with one layout of all of them
 """
 
-import graph_aux as aux
+import graph_core as core
+import graph_io
+import render_worker
+import reachability
+import profiling
+import backends
+from graph_core import vertex, edge, dependency_line # The classes that correspond with the structs in the e file
 from config import *
 
 from datetime import datetime as datetime
-from packaging import version
-import plotly.graph_objects as go
-import plotly.offline as po
+import concurrent.futures
+import multiprocessing
 import platform
+import shutil
+import math
+import sys
 import os
 
-
-class vertex:
-    """ The class that corresponds with the vertex struct in the e file
-    Class attributes:
-    name - The displayed name of the item
-    pkg - The package the item belongs to
-    """
-    def get_name(self):
-        """ Returns the name attribute of the vertex """
-        return self.name
-
-class edge:
-    """ The class that corresponds with the edge struct in the e file
-    Class attributes:
-    src_vertex - An object of type vertex from which the edge starts
-    dst_vertex - An object of type vertex to which the edge ends
-    lines - The additional information displayed while hovering over the edge
-    """
-    def to_tuple(self):
-        """ Returns a tuple of the vertex names of the start and end of the edge """
-        return (self.src_vertex.get_name(), self.dst_vertex.get_name())
+# Imported when a graph is first drawn, so writing graph info to file does not import plotly, networkx and numpy
+aux = backends.get_backend("render")
+go = backends.get_backend("figure")
+pio = backends.get_backend("html")
 
 
 ###### CONSTANTS ######
 
 SUPPORTED_TYPES = ["modules", "packages"]
 PYTHON_VERSION = "3.2.0"
+PACKAGE_NODE_SCALE = 3 # The growth of a package vertex size with the square root of its amount of modules (LEVEL_OF_DETAIL option)
 
 #######################
 
@@ -86,34 +91,267 @@ def graph_to_file(vertices, edges, imported, item_name, item_type):
         The entity type of the graph
         Must be one of the const SUPPORTED_TYPES
     """
-    vertex_names =  [v.get_name() for v in vertices]
+    with profiling.Profile("graph_to_file", item_name, item_type) as profile:
+        profile.stage("build graph")
+        write_graph_file(core.DependencyGraph.from_objects(vertices, edges, imported), item_name, item_type, profile)
 
-    parsed_imported = aux.parse_edges(imported)
-    import_list = parsed_imported["edge_list"]
 
-    parsed_edges = aux.parse_edges(edges) # A dictionary that contains the edge names and dependency additional info
-    edge_list = parsed_edges["edge_list"]
-    line_list = parsed_edges["line_list"] # The dependency info lines to be displayed on each edge
+def graph_to_file_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst, item_name, item_type):
+    """Writes graph info to file in text format, from parallel flat lists instead of vertex and edge objects
+    Note - This function is called from E code.
+
+    Parameters
+    ----------
+    names : list of string
+        The vertex names, the index of a vertex in this list is used by the edge lists
+    pkgs : list of string
+        The package of every vertex
+    edge_src, edge_dst : list of int
+        The source and destination vertex indices of every dependency
+    line_offsets : list of int
+        The index of the first dependency info line of every dependency, counted in lines (not in strings)
+    lines : list of string
+        The dependency info lines of all of the dependencies, in the order of the dependencies.
+        Every line is three strings, its dependent element, dependee element and module
+    import_src, import_dst : list of int
+        The source and destination vertex indices of every import dependency
+    item_name : string
+        The name of the base entity from which the graph was created
+    item_type : string
+        The entity type of the graph
+    """
+    with profiling.Profile("graph_to_file_flat", item_name, item_type) as profile:
+        profile.stage("build graph")
+        write_graph_file(core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst), item_name, item_type, profile)
 
+
+def write_graph_file(graph, item_name, item_type, profile=None, reduce=True, reachability_index=REACHABILITY_INDEX):
+    """Writes the info of a DependencyGraph to a file in the format selected by TEXT_FILE_FORMAT, and returns its path
+    When reduce is False, the graph was already reduced and the reductions are not applied again.
+    When reachability_index is True, the reachability index of a module graph of all of the modules is saved next to the file, before the reductions.
+    """
+    if profile is None:
+        with profiling.Profile("write_graph_file", item_name, item_type) as profile:
+            return write_graph_file(graph, item_name, item_type, profile, reduce, reachability_index)
     folder_path = os.getcwd() + "/" + TEXT_FILE_FOLDER
     if not os.path.exists(folder_path):
         os.makedirs(folder_path)
 
-    full_path = folder_path + item_type + "-" + item_name + "-" + datetime.now().strftime("%Y_%m_%d_%H_%M") + TEXT_FILE_EXTENSION
+    removed_edges = 0
+    unreduced_graph = graph
+    if reduce:
+        profile.stage("reduce graph")
+        (graph, removed_edges) = reduce_graph(graph)
+    profile.set_counts(graph)
+    profile.stage("write file")
+    base_path = folder_path + item_type + "-" + item_name + "-" + datetime.now().strftime("%Y_%m_%d_%H_%M")
+    if TEXT_FILE_FORMAT == "structured":
+        full_path = base_path + STRUCTURED_FILE_EXTENSION + (".gz" if TEXT_FILE_COMPRESS else "")
+        graph_io.write_graph(full_path, graph, item_name, item_type, TEXT_FILE_COMPRESS, removed_edges)
+    else:
+        full_path = base_path + TEXT_FILE_EXTENSION
+        write_legacy_text(full_path, graph, removed_edges)
+    profile.end_stage()
+    print("Graph info has been written to a text file at the following path:")
+    print(full_path)
+    if reachability_index and item_type == "modules" and reachability.is_full_scope(item_name):
+        profile.stage("reachability index")
+        reachability.save_index(unreduced_graph, full_path, item_name)
+    profile.finish(full_path)
+    return full_path
+
+
+def write_legacy_text(full_path, graph, removed_edges=0):
+    """Writes graph info to file as the text of Python lists"""
     with open(full_path, 'w') as f:
+        if CONDENSE_CYCLES or TRANSITIVE_REDUCTION:
+            f.write("Removed edges:\n")
+            f.write(str(removed_edges) + "\n\n")
         f.write("Vertices:\n")
-        f.write(str(vertex_names) + "\n\n")
+        f.write(str(graph.names) + "\n\n")
         f.write("Imports:\n")
-        f.write(str(import_list) + "\n\n")
+        f.write(str(graph.import_list()) + "\n\n")
         f.write("Edges:\n")
-        f.write(str(edge_list) + "\n\n")
+        f.write(str(graph.edge_list()) + "\n\n")
         f.write("Dependency info:\n")
-        f.write(str(line_list) + "\n\n")
-    print("Graph info has been written to a text file at the following path:")
-    print(full_path)
-        
+        f.write(str(graph.display_lines()) + "\n\n")
+        if graph.members is not None:
+            f.write("Cycle members:\n")
+            f.write(str({name: members for (name, members) in zip(graph.names, graph.members) if members}) + "\n\n")
+
+
+def reduce_graph(graph):
+    """Applies the graph reductions selected in the config file, and returns the reduced graph and the amount of removed edges
+    Both reductions take near linear time, cycles are condensed before the transitive reduction.
+    """
+    edge_amount = len(graph.edges) + len(graph.unused_imports)
+    if CONDENSE_CYCLES:
+        graph = graph.condensed(CYCLE_DEPENDENCY_LINE_CAP)
+    if TRANSITIVE_REDUCTION:
+        graph = graph.transitive_reduction()[0]
+    removed_edges = edge_amount - (len(graph.edges) + len(graph.unused_imports))
+    if CONDENSE_CYCLES or TRANSITIVE_REDUCTION:
+        print("The graph reduction removed", removed_edges, "of", edge_amount, "edges")
+    return (graph, removed_edges)
+
+
+def package_graph(vertices, edges, item_name, blacklist=[], to_file=False, background=False):
+    """Rolls module dependencies up to a graph of their packages, and writes it to file or displays it
+    Note - This function is called from E code.
+
+    The module dependencies are grouped by the package of their vertices in linear time.
+    Dependencies between modules of two packages are merged into a single edge, and their dependency info lines
+    are deduplicated and limited to PACKAGE_DEPENDENCY_LINE_CAP. Dependencies inside a package are dropped.
+
+    Parameters
+    ----------
+    vertices : list of vertex
+        The modules, with the package each module belongs to
+    edges : list of edge
+        Represents the dependencies between two modules
+    item_name : string
+        The name of the base package from which the graph was created
+    blacklist : list, optional
+        A list of packages that can be displayed or hidden (default is an empty list)
+    to_file : bool, optional
+        When True, the graph info is written to file instead of being displayed (default is False)
+    background : bool, optional
+        When True, the graph is created by the background worker (default is False)
+    """
+    with profiling.Profile("package_graph", item_name, "packages") as profile:
+        profile.stage("build graph")
+        write_package_graph(core.DependencyGraph.from_objects(vertices, edges, []), item_name, blacklist, to_file, background, profile)
+
+
+def package_graph_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, item_name, blacklist=[], to_file=False, background=False):
+    """Rolls module dependencies up to a graph of their packages, from parallel flat lists instead of vertex and edge objects
+    Note - This function is called from E code.
+
+    The graph parameters are the same as in graph_to_file_flat, without imports. The other parameters are the same as in package_graph.
+    """
+    with profiling.Profile("package_graph_flat", item_name, "packages") as profile:
+        profile.stage("build graph")
+        write_package_graph(core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, [], []),
+                            item_name, blacklist, to_file, background, profile)
+
+
+def write_package_graph(graph, item_name, blacklist, to_file, background, profile):
+    """Rolls a module DependencyGraph up to its packages, and writes it to file, queues it or displays it"""
+    profile.stage("package rollup")
+    graph = graph.package_graph(PACKAGE_DEPENDENCY_LINE_CAP)
+    if to_file:
+        write_graph_file(graph, item_name, "packages", profile)
+    elif background:
+        profile.stage("queue job")
+        render_worker.queue_graph(graph, item_name, "packages", blacklist)
+        profile.finish()
+    else:
+        render_graph(graph, item_name, "packages", blacklist, profile=profile)
+
+
+def batch_graph(vertices, edges, imported, roots, item_type, to_file=False):
+    """Writes a graph file for every one of a list of roots, from a single graph of all of them
+    Note - This function is called from E code.
+
+    Parameters
+    ----------
+    vertices, edges, imported : list
+        The union graph of all of the roots, the same as in draw_graph
+    roots : list of string
+        The names of the modules or packages whose graphs are written
+    item_type : string
+        The entity type of the roots, one of the const SUPPORTED_TYPES
+    to_file : bool, optional
+        When True, the graph info is written to text files instead of HTML files (default is False)
+
+    Returns
+    -------
+    list of string
+        The paths of the created files, in the order of the roots that are in the graph
+    """
+    return render_batch(core.DependencyGraph.from_objects(vertices, edges, imported), roots, item_type, to_file)
+
 
-def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
+def batch_graph_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst, roots, item_type, to_file=False):
+    """Writes a graph file for every one of a list of roots, from parallel flat lists instead of vertex and edge objects
+    Note - This function is called from E code.
+
+    The graph parameters are the same as in graph_to_file_flat, the other parameters are the same as in batch_graph.
+    """
+    return render_batch(core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst),
+                        roots, item_type, to_file)
+
+
+def render_batch(graph, roots, item_type, to_file=False):
+    """Writes a graph file for every root, and returns their paths
+    The graph is reduced once, and the view of every root is extracted from it as a subgraph, with the same vertices as the graph
+    of a single root: the root, everything it depends on recursively, and everything that depends on it recursively (as in module_graph).
+    The root of a packages batch is all of the modules of the package, and its view is everything they depend on recursively
+    (as in package_graph), rolled up to packages. A root that is a member of a condensed cycle is found through its cycle vertex.
+    The union of the views is laid out once, so a vertex has the same position in the HTML files of all of the roots
+    (except with LEVEL_OF_DETAIL, which lays out every file by its packages).
+    The files are written in parallel by BATCH_WORKERS processes.
+    """
+    if item_type not in SUPPORTED_TYPES:
+        print("\t*** Error: The supported item_type parameter values are: ", SUPPORTED_TYPES)
+        return []
+    unreduced_graph = graph
+    graph = reduce_graph(graph)[0]
+
+    # The roots are found by the names before the reduction, the members of a cycle are mapped to the cycle vertex
+    reduced_ids = dict(graph.ids)
+    if graph.members is not None:
+        for (i, members) in enumerate(graph.members):
+            reduced_ids.update(dict.fromkeys(members, i))
+    root_sources = {}
+    for (name, pkg) in zip(unreduced_graph.names, unreduced_graph.pkgs):
+        root_sources.setdefault(name if item_type == "modules" else pkg, set()).add(reduced_ids[name])
+    views = []
+    view_ids = set()
+    for root in dict.fromkeys(roots):
+        if root not in root_sources:
+            print("The", item_type[:-1], root, "is not in the graph")
+            continue
+        sources = root_sources[root]
+        current_ids = graph.reachable(sources)
+        if item_type == "modules":
+            current_ids |= graph.reachable(sources, reverse=True)
+        view_ids |= current_ids
+        view = graph.subgraph(current_ids)
+        views.append((root, view if item_type == "modules" else view.package_graph(PACKAGE_DEPENDENCY_LINE_CAP)))
+    if not views:
+        return []
+
+    node_pos = {}
+    if not to_file:
+        layout_graph = graph.subgraph(view_ids)
+        if item_type == "packages":
+            layout_graph = layout_graph.package_graph(PACKAGE_DEPENDENCY_LINE_CAP)
+        node_pos = aux.create_pos(layout_graph.names, layout_graph.edge_list() + layout_graph.unused_import_list())
+    jobs = [(view, root, item_type, to_file, {name: node_pos[name] for name in view.names} if not to_file else None) for (root, view) in views]
+
+    worker_amount = min(len(jobs), BATCH_WORKERS or os.cpu_count() or 1)
+    if worker_amount <= 1:
+        paths = [write_batch_view(*job) for job in jobs]
+    else:
+        # Spawned workers run ASYNC_WORKER_PYTHON, since the executable of the process may be Specman
+        context = multiprocessing.get_context("spawn")
+        context.set_executable(shutil.which(ASYNC_WORKER_PYTHON) or ASYNC_WORKER_PYTHON)
+        with concurrent.futures.ProcessPoolExecutor(worker_amount, mp_context=context) as executor:
+            paths = list(executor.map(write_batch_view, *zip(*jobs)))
+    paths = [path for path in paths if path is not None]
+    print("The graphs of", len(paths), "of", len(roots), item_type, "have been written")
+    return paths
+
+
+def write_batch_view(graph, root, item_type, to_file, node_pos):
+    """Writes the graph file of a single root of a batch, and returns its path. Runs in a worker process of render_batch"""
+    if to_file:
+        return write_graph_file(graph, root, item_type, reduce=False)
+    return render_graph(graph, root, item_type, open_browser=False, node_pos=node_pos, reduce=False)
+
+
+def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[], open_browser=True, focus_hops=0):
     
     """Creates an HTML file that displays an interactive graph
     Note - This function is called from E code.
@@ -135,28 +373,81 @@ def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
         Must be one of the const SUPPORTED_TYPES
     blacklist : list, optional
         A list of entities that can be displayed or hidden (default is an empty list)
+    open_browser : bool, optional
+        When True, the created file is opened in the browser (default is True)
+    focus_hops : int, optional
+        When above 0, only the modules within this amount of dependencies from item_name, in either direction, are drawn (default is 0)
+
+    Returns
+    -------
+    string
+        The path of the created html file, or None if the graph was not created
     """
-    
-    if version.parse(platform.python_version()) < version.parse(PYTHON_VERSION):
+    with profiling.Profile("draw_graph", item_name, item_type) as profile:
+        profile.stage("build graph")
+        return render_graph(core.DependencyGraph.from_objects(vertices, edges, imported), item_name, item_type, blacklist, open_browser, profile, focus_hops=focus_hops)
+
+
+def draw_graph_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst, item_name, item_type, blacklist=[], focus_hops=0):
+    """Creates an HTML file that displays an interactive graph, from parallel flat lists instead of vertex and edge objects
+    Note - This function is called from E code.
+
+    The graph parameters are the same as in graph_to_file_flat, the other parameters are the same as in draw_graph.
+    """
+    with profiling.Profile("draw_graph_flat", item_name, item_type) as profile:
+        profile.stage("build graph")
+        return render_graph(core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst), item_name, item_type, blacklist,
+                            profile=profile, focus_hops=focus_hops)
+
+
+def render_graph(graph, item_name, item_type, blacklist=[], open_browser=True, profile=None, node_pos=None, reduce=True, focus_hops=0):
+    """Creates an HTML file that displays a DependencyGraph, and returns its path or None if the graph was not created
+    The stages are measured in profile, which is created if it is not given and profiling is enabled.
+    When node_pos is given, the vertices are drawn in these positions and the graph is not laid out.
+    When reduce is False, the graph was already reduced and the reductions are not applied again.
+    When focus_hops is above 0, the graph is pruned to the neighbourhood of item_name before anything else is done (see focus_graph).
+    """
+    if profile is None:
+        with profiling.Profile("render_graph", item_name, item_type) as profile:
+            return render_graph(graph, item_name, item_type, blacklist, open_browser, profile, node_pos, reduce, focus_hops)
+    if sys.version_info < tuple(int(part) for part in PYTHON_VERSION.split(".")):
         print("\t*** Error: Python version", PYTHON_VERSION, "is required.")
         print("\tYour current version is " + platform.python_version())
+        profile.finish()
         return
 
     if item_type not in SUPPORTED_TYPES:
         print("\t*** Error: The supported item_type parameter values are: ", SUPPORTED_TYPES)
+        profile.finish()
         return
-    if len(vertices) == 0:
+    if len(graph.names) == 0:
         print("The module may not be loaded")
+        profile.finish()
         return
-
-    # Extract information from input objects
-    vertex_names =  [v.get_name() for v in vertices]
-    parsed_edges = aux.parse_edges(edges) # A dictionary that contains the edge names and dependency additional info
-    edge_list = parsed_edges["edge_list"]
-    line_list = parsed_edges["line_list"] # The dependency info lines to be displayed on each edge
-
-    parsed_imported = aux.parse_edges(imported)
-    import_list = [import_edge for import_edge in parsed_imported["edge_list"] if import_edge not in edge_list] 
+    focus_info = None
+    if focus_hops > 0 and item_type == "modules":
+        if item_name in graph.ids:
+            profile.stage("focus")
+            (graph, pruned) = focus_graph(graph, item_name, focus_hops)
+            focus_info = "Focused on " + str(focus_hops) + " dependencies around " + item_name + ", " + str(pruned) + " modules were pruned"
+            print(focus_info)
+        else:
+            print("The module", item_name, "is not in the graph, the graph is not focused")
+    if reduce:
+        profile.stage("reduce graph")
+        graph = reduce_graph(graph)[0]
+    profile.set_counts(graph)
+    profile.stage("edge info")
+
+    # Extract information from the graph
+    vertex_names = graph.names
+    edge_list = graph.edge_list()
+    if LAZY_DETAIL: # All of the lines are displayed when the edge is clicked
+        line_list = graph.display_lines(LAZY_DETAIL_SUMMARY_LINES, "... {amount} lines, click for all")
+    else:
+        line_list = graph.display_lines() # The dependency info lines to be displayed on each edge
+
+    import_list = graph.unused_import_list()
     import_info_list =[]
     for import_edge in import_list:
         import_info_list.append(import_edge[0] + " imports " + import_edge[1] + " but does not use it")
@@ -164,24 +455,97 @@ def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
 
 
     # Generate the positions of the graph components
-    node_pos = aux.create_pos(vertex_names, edge_list+import_list)
-    middle_and_arrow_pos = aux.create_middle_and_arrow_pos(edge_list, line_list, node_pos)
-    import_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(import_list, import_info_list, node_pos)
+    level_of_detail = LEVEL_OF_DETAIL and item_type == "modules" # Only the packages are laid out as a whole
+    if not level_of_detail and node_pos is None:
+        profile.stage("layout")
+        node_pos = aux.create_pos(vertex_names, edge_list+import_list)
+    profile.stage("traces")
+    node_dependee_amount = graph.dependee_amounts()
+
+    # The vertices that are hidden by the toggle feature
+    hidden = list(blacklist)
+    if item_type == "modules":
+        hidden += graph.standalones() # Vertices that are not related by dependency to any other
+
+    axis = aux.create_axis()
+    (max_dependee, dependee_amount) = graph.max_dependee()
+    (max_dependent, dependent_amount) = graph.max_dependent()
+
+    post_script = []
+    if level_of_detail:
+        (graph_data, my_layout) = create_level_of_detail_figure(graph, node_dependee_amount, line_list, import_info_list, axis,
+                                                                max_dependee, dependee_amount, max_dependent, dependent_amount, item_type, focus_info)
+        post_script.append(aux.EXPAND_SCRIPT)
+    elif COMPACT_HTML:
+        # A single set of traces, the toggle changes the visibility of the hidden vertices traces
+        (graph_data, visibility_masks) = aux.create_shared_traces(graph, node_pos, node_dependee_amount, edge_list, line_list, import_list, import_info_list, set(hidden))
+        profile.stage("annotations")
+        my_layout = aux.create_layout(axis, [], [], [], [], [], [], [], [], len(vertex_names), len(edge_list)+len(import_list),
+                                      max_dependee, dependee_amount, max_dependent, dependent_amount, len(graph_data), 0, str(item_type),
+                                      batched_edges=True, visibility_masks=visibility_masks, extra_info=focus_info)
+    else:
+        (graph_data, my_layout) = create_duplicated_figure(graph, node_pos, node_dependee_amount, edge_list, line_list, import_list, import_info_list, hidden, axis,
+                                                           max_dependee, dependee_amount, max_dependent, dependent_amount, item_type, profile, focus_info)
+
+
+
+    #Render and display the graph
+    profile.stage("figure validation")
+    fig1=go.Figure(data=graph_data, layout=my_layout)
+    
+    folder_path = os.getcwd() + "/" + HTML_FILE_FOLDER
+    os.makedirs(folder_path, exist_ok=True)
+    
+    filename = folder_path + item_type + "-" + item_name + "-" + datetime.now().strftime("%Y_%m_%d_%H_%M") + '.html'
+    if LAZY_DETAIL:
+        profile.stage("detail file")
+        post_script.append(aux.write_detail_file(filename, graph))
+    profile.stage("write file")
+    if COMPACT_HTML: # The figure was already validated, the plotly.js bundle is shared by all of the files in the folder
+        pio.write_html(aux.strip_defaults(fig1.to_plotly_json()), filename, auto_open=False, config={"displayModeBar":False, "responsive":True},
+                       include_plotlyjs="directory", validate=False, post_script=post_script)
+    else:
+        pio.write_html(fig1, filename, auto_open=False, config={"displayModeBar":False, "responsive":True}, post_script=post_script) # Creates the graph into an interactive HTML file
+    graph_filename = filename
+    if open_browser:
+        profile.stage("browser launch")
+        aux.display_in_browser("file://" + graph_filename)
+    profile.finish(graph_filename)
+    return graph_filename
+
+
+def focus_graph(graph, item_name, hops):
+    """Returns the subgraph of the vertices within hops dependencies of item_name, and the amount of pruned vertices
+    The vertices that item_name reaches and the vertices that reach it are found by a breadth first search in each direction,
+    so the layout and the traces are built only for the neighbourhood instead of the whole environment.
+    The unused imports are followed as well, since they are drawn as edges.
+    """
+    source = [graph.ids[item_name]]
+    kept = graph.reachable(source, max_hops=hops, include_imports=True) | graph.reachable(source, reverse=True, max_hops=hops, include_imports=True)
+    return (graph.subgraph(kept), len(graph.names) - len(kept))
+
+
+def create_duplicated_figure(graph, node_pos, node_dependee_amount, edge_list, line_list, import_list, import_info_list, hidden, axis,
+                             max_dependee, dependee_amount, max_dependent, dependent_amount, item_type, profile, extra_info=None):
+    """Returns the traces and layout of a figure with a full and a secondary copy of the graph for the toggle feature"""
+    middle_and_arrow_pos = aux.create_middle_and_arrow_pos(edge_list, line_list, node_pos, node_sizes=node_dependee_amount)
+    import_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(import_list, import_info_list, node_pos, node_sizes=node_dependee_amount)
 
 
 
     # Build graph components in positions
-    middle_node_trace = aux.create_middle_node_trace(middle_and_arrow_pos, ARROW_COLOR)
+    batched_edges = len(edge_list) + len(import_list) > BATCHED_EDGES_THRESHOLD # Many annotations are too slow to build and to display
+    middle_node_trace = aux.create_middle_node_trace(middle_and_arrow_pos, ARROW_COLOR, LAZY_DETAIL)
     middle_import_trace = aux.create_middle_node_trace(import_middle_and_arrow_pos, ERROR_ARROW_COLOR)
     label_module_trace = aux.create_node_label_trace([pos[0] for (node, pos) in node_pos.items()] , [pos[1] for (node, pos) in node_pos.items()], [node for node in node_pos.keys()])
 
-    full_graph_data = [middle_node_trace, middle_import_trace, label_module_trace]
+    full_graph_data = []
+    if batched_edges:
+        full_graph_data += aux.create_edge_traces(middle_and_arrow_pos, import_middle_and_arrow_pos)
+    full_graph_data += [middle_node_trace, middle_import_trace, label_module_trace]
+    base_trace_amount = len(full_graph_data) # The traces that are not displayed in the legend
 
-    dependees = [edge[1] for edge in edge_list+import_list]
-    dependents = [edge[0] for edge in edge_list+import_list]
-    node_dependee_amount = {v: dependees.count(v) for v in vertex_names}
-    node_dependent_amount = {v: dependents.count(v) for v in vertex_names}
-    trace_dict = aux.create_node_traces(vertices, node_pos, node_dependee_amount) # A dictionary of all of the node traces
+    trace_dict = aux.create_node_traces(graph, node_pos, node_dependee_amount) # A dictionary of all of the node traces
 
     for pkg in trace_dict:
         node_module_trace = aux.create_node_module_trace(trace_dict[pkg]["Xv"], trace_dict[pkg]["Yv"],  trace_dict[pkg]["name"], trace_dict[pkg]["size"], pkg)
@@ -189,20 +553,17 @@ def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
 
 
     # Create the secondary graph for toggle feature
-    if item_type == "modules":
-        connected_vertices = set([edge[0] for edge in (edge_list + import_list)] + [edge[1] for edge in (edge_list + import_list)])
-        standalones = list(filter(lambda vertex : vertex not in connected_vertices, vertex_names)) # Vertices that are not related by dependency to any other
-        blacklist += standalones
-        
-    
-    secondary_node_pos = {node: pos for node, pos in node_pos.items() if node not in blacklist}
-    secondary_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(edge_list, line_list, secondary_node_pos)
-    secondary_import_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(import_list, import_info_list, secondary_node_pos)
-    secondary_trace_dict = aux.create_node_traces(vertices, secondary_node_pos, node_dependee_amount) # A dictionary of all connected node traces
+    secondary_node_pos = {node: pos for node, pos in node_pos.items() if node not in hidden}
+    secondary_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(edge_list, line_list, secondary_node_pos, node_sizes=node_dependee_amount)
+    secondary_import_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(import_list, import_info_list, secondary_node_pos, node_sizes=node_dependee_amount)
+    secondary_trace_dict = aux.create_node_traces(graph, secondary_node_pos, node_dependee_amount) # A dictionary of all connected node traces
     secondary_label_module_trace = aux.create_node_label_trace([pos[0] for (node, pos) in secondary_node_pos.items()] , [pos[1] for (node, pos) in secondary_node_pos.items()], [node for node in secondary_node_pos.keys()])
-    secondary_middle_node_trace = aux.create_middle_node_trace(secondary_middle_and_arrow_pos, ARROW_COLOR)
+    secondary_middle_node_trace = aux.create_middle_node_trace(secondary_middle_and_arrow_pos, ARROW_COLOR, LAZY_DETAIL)
     secondary_middle_import_trace = aux.create_middle_node_trace(import_middle_and_arrow_pos, ERROR_ARROW_COLOR)
-    secondary_graph_data = [secondary_middle_node_trace, secondary_middle_import_trace, secondary_label_module_trace]
+    secondary_graph_data = []
+    if batched_edges:
+        secondary_graph_data += aux.create_edge_traces(secondary_middle_and_arrow_pos, secondary_import_middle_and_arrow_pos, is_visible=False)
+    secondary_graph_data += [secondary_middle_node_trace, secondary_middle_import_trace, secondary_label_module_trace]
 
     for pkg in secondary_trace_dict:
         secondary_node_module_trace = aux.create_node_module_trace(secondary_trace_dict[pkg]["Xv"], secondary_trace_dict[pkg]["Yv"],  secondary_trace_dict[pkg]["name"], secondary_trace_dict[pkg]["size"], pkg, is_visible=False)
@@ -211,8 +572,6 @@ def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
 
 
     # Build arrows in graph
-    axis = aux.create_axis()
-
     Xarrow = middle_and_arrow_pos["Xarrow"]
     Yarrow = middle_and_arrow_pos["Yarrow"]
 
@@ -226,24 +585,96 @@ def draw_graph(vertices, edges, imported, item_name, item_type, blacklist=[]):
     Xsecondary_import = secondary_import_middle_and_arrow_pos["Xarrow"]
     Ysecondary_import = secondary_import_middle_and_arrow_pos["Yarrow"]
 
+    profile.stage("annotations")
+    my_layout = aux.create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary, Xsecondary_import, Ysecondary_import, len(graph.names), len(edge_list)+len(import_list),  
+                                  max_dependee, dependee_amount, max_dependent, dependent_amount, len(full_graph_data), len(secondary_graph_data), str(item_type),
+                                  base_trace_amount, batched_edges, extra_info=extra_info)
+    return (full_graph_data + secondary_graph_data, my_layout)
 
-    max_dependee = max(node_dependee_amount, key=lambda k: node_dependee_amount[k])
-    max_dependent = max(node_dependent_amount, key=lambda k: node_dependent_amount[k])
 
-    my_layout = aux.create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary, Xsecondary_import, Ysecondary_import, len(vertex_names), len(edge_list)+len(import_list),  
-                                  max_dependee, node_dependee_amount[max_dependee], max_dependent, node_dependent_amount[max_dependent], len(full_graph_data), len(secondary_graph_data), str(item_type))
-    
-    
-    
-    #Render and display the graph
-    fig1=go.Figure(data=full_graph_data+secondary_graph_data, layout=my_layout)
-    
-    folder_path = os.getcwd() + "/" + HTML_FILE_FOLDER
-    os.makedirs(folder_path, exist_ok=True)
-    
-    graph_filename = po.plot(fig1, filename=folder_path + item_type + "-" + item_name + "-" + datetime.now().strftime("%Y_%m_%d_%H_%M") + '.html', auto_open=False, config={"displayModeBar":False}) # Creates the graph into an interactive HTML file
-    aux.display_in_browser("file://" + graph_filename)
-    
+
+def create_level_of_detail_figure(graph, node_dependee_amount, line_list, import_info_list, axis,
+                                  max_dependee, dependee_amount, max_dependent, dependent_amount, item_type, extra_info=None):
+    """Returns the traces and layout of a figure with a vertex per package, and hidden traces of the modules of every package
+    The packages are laid out as a whole, and the modules of every package are laid out on their own in a circle around it.
+    The dependencies between packages are merged, their width grows with the amount of merged dependencies.
+    A click on a package shows or hides its traces (see aux.EXPAND_SCRIPT).
+    """
+    package_graph = graph.package_graph(PACKAGE_DEPENDENCY_LINE_CAP)
+    package_edge_list = package_graph.edge_list()
+    package_pos = aux.create_pos(package_graph.names, package_edge_list)
+    package_radius = aux.create_package_radius(package_pos)
+
+    # The modules, dependencies and unused imports inside every package
+    package_modules = {pkg: [] for pkg in package_graph.names}
+    for (name, pkg) in zip(graph.names, graph.pkgs):
+        package_modules[pkg].append(name)
+    package_edges = {pkg: [] for pkg in package_graph.names}
+    for (i, (src, dst)) in enumerate(graph.edges):
+        if graph.pkgs[src] == graph.pkgs[dst]:
+            package_edges[graph.pkgs[src]].append(i)
+    package_imports = {pkg: [] for pkg in package_graph.names}
+    for (i, (src, dst)) in enumerate(graph.unused_imports):
+        if graph.pkgs[src] == graph.pkgs[dst]:
+            package_imports[graph.pkgs[src]].append(i)
+    edge_list = graph.edge_list()
+    import_list = graph.unused_import_list()
+
+    # The dependencies between packages, grouped by their width
+    package_lines = ["%d module dependencies<br>" % weight + lines for (weight, lines) in zip(package_graph.weights, package_graph.display_lines())]
+    package_sizes = {pkg: PACKAGE_NODE_SCALE * math.sqrt(len(modules)) for (pkg, modules) in package_modules.items()} # Added to BASE_NODE_SIZE
+    package_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(package_edge_list, package_lines, package_pos, node_sizes=package_sizes)
+    widths = [min(LEVEL_OF_DETAIL_MAX_EDGE_WIDTH, 1 + int(math.log2(weight))) for weight in package_graph.weights]
+    graph_data = []
+    for width in sorted(set(widths)):
+        width_edges = [i for i in range(len(package_edge_list)) if widths[i] == width]
+        width_pos = aux.create_middle_and_arrow_pos([package_edge_list[i] for i in width_edges], [package_lines[i] for i in width_edges], package_pos)
+        graph_data.append(aux.create_edge_line_trace(width_pos, ARROW_COLOR, width))
+    graph_data.append(aux.create_arrowhead_trace(package_middle_and_arrow_pos, ARROW_COLOR))
+    graph_data.append(aux.create_middle_node_trace(package_middle_and_arrow_pos, ARROW_COLOR))
+    graph_data.append(aux.create_node_label_trace([pos[0] for pos in package_pos.values()], [pos[1] for pos in package_pos.values()], list(package_pos.keys())))
+
+    # A package trace is followed by the hidden traces of its modules, the package point holds their indices
+    package_traces = []
+    module_traces = []
+    for (i, pkg) in enumerate(package_graph.names):
+        color = aux.PACKAGE_COLORS[i % len(aux.PACKAGE_COLORS)]
+        edges = package_edges[pkg]
+        imports = package_imports[pkg]
+        pkg_edge_list = [edge_list[j] for j in edges]
+        pkg_import_list = [import_list[j] for j in imports]
+        pkg_import_info_list = [import_info_list[j] for j in imports]
+        module_pos = aux.create_cluster_pos(package_modules[pkg], pkg_edge_list + pkg_import_list, package_pos[pkg], package_radius[pkg])
+        middle_and_arrow_pos = aux.create_middle_and_arrow_pos(pkg_edge_list, [line_list[j] for j in edges], module_pos, node_sizes=node_dependee_amount)
+        import_middle_and_arrow_pos = aux.create_middle_and_arrow_pos(pkg_import_list, pkg_import_info_list, module_pos, node_sizes=node_dependee_amount)
+        hover_pos = aux.create_middle_and_arrow_pos(pkg_edge_list + pkg_import_list, [line_list[j] for j in edges] + pkg_import_info_list, module_pos,
+                                                    edges + [None] * len(imports)) # Only dependencies have details
+        trace_dict = aux.create_node_traces(graph, module_pos, node_dependee_amount)[pkg]
+        pkg_module_traces = aux.create_edge_traces(middle_and_arrow_pos, import_middle_and_arrow_pos, is_visible=False)
+        pkg_module_traces.append(aux.create_middle_node_trace(hover_pos, ARROW_COLOR, LAZY_DETAIL))
+        pkg_module_traces.append(aux.create_node_module_trace(trace_dict["Xv"], trace_dict["Yv"], trace_dict["name"], trace_dict["size"], pkg, is_visible=False))
+        pkg_module_traces[-1].update(mode='markers+text', textposition='bottom center', marker_color=color)
+        pkg_module_traces[-1].update(hovertext=trace_dict["name"], text=package_modules[pkg], hoverinfo='text') # The labels are the names, the hover texts may list cycle members
+        for trace in pkg_module_traces[:-1]:
+            trace.visible = False
+
+        package_size = BASE_NODE_SIZE + package_sizes[pkg]
+        package_traces.append(aux.create_node_module_trace([package_pos[pkg][0]], [package_pos[pkg][1]],
+                                                           [pkg + "<br>" + str(len(package_modules[pkg])) + " modules, click to show or hide them"], [package_size], pkg))
+        package_traces[-1].update(marker_color=color, marker_opacity=0.4)
+        module_traces.append(pkg_module_traces)
+
+    base_trace_amount = len(graph_data)
+    for (package_trace, pkg_module_traces) in zip(package_traces, module_traces):
+        package_trace.customdata = [[len(graph_data) + 1, len(pkg_module_traces)]]
+        graph_data.append(package_trace)
+        graph_data += pkg_module_traces
+
+    my_layout = aux.create_layout(axis, [], [], [], [], [], [], [], [], len(graph.names), len(graph.edges)+len(graph.unused_imports),
+                                  max_dependee, dependee_amount, max_dependent, dependent_amount, len(graph_data), 0, str(item_type),
+                                  base_trace_amount, batched_edges=True, extra_info=extra_info)
+    my_layout.updatemenus = [] # The packages are expanded by clicking, instead of the standalones toggle
+    return (graph_data, my_layout)
 
 
         
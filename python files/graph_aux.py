@@ -3,88 +3,280 @@
 These functions are not public, they are for inner use of the Dependency Graph tool.
 This file is required to be in the same folder as:
     create_graph.py
+    graph_core.py
+    layout_engines.py
+    layout_cache.py
     config.py
 """
 from config import *
+import graph_core as core
+import layout_engines
+import layout_cache
 
 import plotly.graph_objects as go
+import plotly.colors
 import networkx as nx
+import numpy as np
 import subprocess
 import random
+import base64
+import gzip
+import json
+import math
+import re
 import shutil
 import os
 
-def parse_edges(edges):
-    parsed_lists = {"edge_list":[], "line_list":[]}
-    for current_edge in edges:
-        parsed_lists["edge_list"].append(current_edge.to_tuple())
-        lines_unique = list(set(current_edge.lines))
-        if len(lines_unique) > DEPENDENCY_INFO_LINE_AMOUNT:
-            lines_unique = lines_unique[:DEPENDENCY_INFO_LINE_AMOUNT]
-            lines_unique.append("...")
-        parsed_lists["line_list"].append("<br>".join(lines_unique))
-    return parsed_lists
-
-def create_pos(vertex_list, edge_list):
+###### CONSTANTS ######
+
+DETAIL_VARIABLE = "dependencyDetails" # The global JavaScript variable that the detail file sets
+DETAIL_SCRIPT = """
+var plot = document.getElementById('{plot_id}');
+var details = null;
+var panel = document.createElement('div');
+panel.style.cssText = 'position:fixed; right:10px; bottom:10px; max-width:50%; max-height:50%; overflow:auto; display:none;' +
+                      'background:white; border:1px solid gray; padding:8px; white-space:pre; font-family:monospace; z-index:10';
+panel.onclick = function() { panel.style.display = 'none'; };
+document.body.appendChild(panel);
+
+function loadDetails(callback) {
+    if (details) { callback(); return; }
+    var script = document.createElement('script');
+    script.src = DETAIL_FILE;
+    script.onload = function() {
+        var bytes = Uint8Array.from(atob(window[DETAIL_VARIABLE]), function(c) { return c.charCodeAt(0); });
+        var stream = new Blob([bytes]).stream().pipeThrough(new DecompressionStream('gzip'));
+        new Response(stream).json().then(function(data) { details = data; callback(); });
+    };
+    document.head.appendChild(script);
+}
+
+plot.on('plotly_click', function(event) {
+    var point = event.points[0];
+    if (typeof point.customdata !== 'number') { return; } // Not a dependency edge
+    loadDetails(function() {
+        var edge = details.edges[point.customdata];
+        var lines = details.lines[point.customdata].map(function(line) { // The text of a line, or the string indices of its triple
+            if (typeof line === 'number') { return details.strings[line]; }
+            var text = details.format; // The text around the dependent, the dependee and the module
+            return text[0] + details.strings[line[0]] + text[1] + details.strings[line[1]] + text[2] + details.strings[line[2]] + text[3];
+        });
+        panel.textContent = details.names[edge[0]] + ' -> ' + details.names[edge[1]] + ' (' + lines.length +
+                            ' lines, click to close)\\n\\n' + lines.join('\\n');
+        panel.style.display = 'block';
+    });
+});
+"""
+PACKAGE_COLORS = plotly.colors.qualitative.Plotly # The package vertex and its modules have the same color
+EXPAND_SCRIPT = """
+var plot = document.getElementById('{plot_id}');
+var expanded = {};
+plot.on('plotly_click', function(event) {
+    var point = event.points[0];
+    if (!Array.isArray(point.customdata)) { return; } // Not a package
+    var first = point.customdata[0];
+    var indices = [];
+    for (var i = first; i < first + point.customdata[1]; i++) { indices.push(i); }
+    expanded[first] = !expanded[first];
+    Plotly.restyle(plot, {visible: expanded[first]}, indices);
+});
+"""
+DEFAULT_ATTRIBUTES = {"visible": True, "showlegend": True, "opacity": 1, "hoverinfo": "all", "textposition": "middle center"} # plotly.js defaults
+
+#######################
+
+
+def create_pos(vertex_list, edge_list, use_cache=True):
     G=nx.DiGraph()
     G.add_nodes_from(vertex_list)
     G.add_edges_from(edge_list)
-    return nx.spring_layout(G, k=0.6, iterations=50)
 
-def create_node_traces(vertices, positions, node_sizes):
+    engine_name = layout_engines.select_engine(len(vertex_list))
+    engine = layout_engines.LAYOUT_ENGINES[engine_name]
+    if not use_cache:
+        return rescale_pos(engine(G, 0.6), 0.6)[0]
+    key = layout_cache.fingerprint(vertex_list, edge_list, engine_name)
+    cached_pos = layout_cache.load_layout(key)
+    if cached_pos is not None: # The graph has not changed since it was last drawn
+        return cached_pos
+
+    previous = None
+    if engine_name in layout_engines.WARM_START_ENGINES:
+        previous = layout_cache.find_closest_layout(vertex_list, engine_name)
+    if previous is None:
+        (pos, k) = rescale_pos(engine(G, 0.6), 0.6)
+    else:
+        (initial_pos, fixed_nodes) = create_warm_start(G, previous)
+        k = previous["k"] # A fixed layout is not rescaled, so the optimal distance must match the scale of the saved positions
+        pos = dict(initial_pos)
+        relaxed_nodes = set(G) - set(fixed_nodes)
+        if relaxed_nodes: # Only the new or moved nodes and their direct neighbours take part in the layout
+            H = G.subgraph(relaxed_nodes.union(*[nx.all_neighbors(G, node) for node in relaxed_nodes]))
+            anchors = [node for node in H if node not in relaxed_nodes]
+            if anchors:
+                pos.update(engine(H, k, pos=initial_pos, fixed=anchors))
+            else:
+                island_pos = rescale_pos(engine(H, k), k)[0] # A new component is placed around the center
+                pos.update({node: node_pos * k * math.sqrt(len(H)) for node, node_pos in island_pos.items()})
+    layout_cache.save_layout(key, edge_list, pos, k, engine_name)
+    return pos
+
+def create_warm_start(G, previous):
+    """Returns the initial positions from a previous layout, and the nodes that kept their neighbours and can stay fixed"""
+    previous_pos = previous["pos"]
+    previous_neighbours = {}
+    for (src, dst) in previous["edges"]:
+        previous_neighbours.setdefault(src, set()).add(dst)
+        previous_neighbours.setdefault(dst, set()).add(src)
+
+    initial_pos = {}
+    fixed_nodes = []
+    for node in G:
+        if node in previous_pos:
+            initial_pos[node] = previous_pos[node]
+            if set(nx.all_neighbors(G, node)) == previous_neighbours.get(node, set()):
+                fixed_nodes.append(node)
+    for node in G:
+        if node not in initial_pos: # New nodes start near their positioned neighbours
+            placed = [initial_pos[n] for n in nx.all_neighbors(G, node) if n in initial_pos]
+            if placed:
+                initial_pos[node] = [sum(p[0] for p in placed) / len(placed) + random.uniform(-0.05, 0.05),
+                                     sum(p[1] for p in placed) / len(placed) + random.uniform(-0.05, 0.05)]
+            else:
+                initial_pos[node] = [random.uniform(-1, 1), random.uniform(-1, 1)]
+    return (initial_pos, fixed_nodes)
+
+def rescale_pos(pos, k):
+    """Rescales the positions to the [-1, 1] range, and returns them with the optimal distance between nodes in the new scale"""
+    if not pos:
+        return (pos, k)
+    pos_arr = np.array(list(pos.values()), dtype=float)
+    center = pos_arr.mean(axis=0)
+    limit = np.abs(pos_arr - center).max()
+    factor = 1.0 / limit if limit > 0 else 1.0
+    return ({node: (pos_arr[i] - center) * factor for i, node in enumerate(pos)}, k * factor)
+
+def create_package_radius(package_pos):
+    """Returns the radius around every package position in which its modules are drawn, a part of the distance to the nearest package
+    The nearest packages are found with a k-d tree, or by comparing every pair of packages when scipy is not installed.
+    """
+    names = list(package_pos)
+    if len(names) < 2:
+        return {name: 1.0 for name in names}
+    pos_arr = np.array([package_pos[name] for name in names], dtype=float)
+    try:
+        from scipy.spatial import cKDTree
+        distances = cKDTree(pos_arr).query(pos_arr, k=2)[0][:, 1]
+    except ImportError:
+        pair_distances = np.linalg.norm(pos_arr[:, None, :] - pos_arr[None, :, :], axis=2)
+        np.fill_diagonal(pair_distances, np.inf)
+        distances = pair_distances.min(axis=1)
+    return {name: max(distance * LEVEL_OF_DETAIL_RADIUS, 0.01) for (name, distance) in zip(names, distances.tolist())}
+
+def create_cluster_pos(vertex_list, edge_list, center, radius):
+    """Returns the positions of the modules of a package, laid out on their own and placed in the circle around the package position
+    Only the layouts of packages with at least LEVEL_OF_DETAIL_CACHE_THRESHOLD modules are cached, smaller ones are faster to lay out again.
+    """
+    pos = create_pos(vertex_list, edge_list, use_cache=len(vertex_list) >= LEVEL_OF_DETAIL_CACHE_THRESHOLD)
+    pos = rescale_pos(pos, 1)[0]
+    return {node: (center[0] + node_pos[0] * radius, center[1] + node_pos[1] * radius) for node, node_pos in pos.items()}
+
+def create_node_traces(graph, positions, node_sizes):
     trace_dict={}
-    for v in vertices:
-        if v.name in positions: # In case positions was filtered
-            if v.pkg not in trace_dict:
-                trace_dict[v.pkg] = {"Xv":[], "Yv":[], "name":[], "size":[]}
-            trace_dict[v.pkg]["Xv"].append(positions[v.name][0])
-            trace_dict[v.pkg]["Yv"].append(positions[v.name][1])
-            trace_dict[v.pkg]["name"].append(v.name)
-            trace_dict[v.pkg]["size"].append(BASE_NODE_SIZE + node_sizes[v.name])
+    for (name, pkg, hover_text) in zip(graph.names, graph.pkgs, graph.hover_texts()):
+        if name in positions: # In case positions was filtered
+            if pkg not in trace_dict:
+                trace_dict[pkg] = {"Xv":[], "Yv":[], "name":[], "size":[]}
+            trace_dict[pkg]["Xv"].append(positions[name][0])
+            trace_dict[pkg]["Yv"].append(positions[name][1])
+            trace_dict[pkg]["name"].append(hover_text)
+            trace_dict[pkg]["size"].append(BASE_NODE_SIZE + node_sizes[name])
     return trace_dict
 
 
-def create_middle_and_arrow_pos(edge_list, line_list, node_pos):
-    Xmid=[]
-    Ymid=[]
-    Xarrow = []
-    Yarrow = []
-    lines = []
-    for i in range(len(edge_list)):
-        current_edge = edge_list[i]
-        if current_edge[0] in node_pos and current_edge[1] in node_pos: # In case node_pos was filtered
-            src_node = node_pos[current_edge[0]]
-            dst_node = node_pos[current_edge[1]]
-            x0 = src_node[0]
-            y0 = src_node[1]
-            x1 = dst_node[0]
-            y1 = dst_node[1]
-            Xmid.append(((x0 + x1) /2.0) + (random.random() * 0.01))
-            Ymid.append((y0 + y1) /2.0)
-            Xarrow.append([x0, x1])
-            Yarrow.append([y0, y1])
-            lines.append(line_list[i])
-    return {"Xmid":Xmid, "Ymid":Ymid, "Xarrow":Xarrow, "Yarrow":Yarrow, "lines": lines}
-
-def create_middle_node_trace(middle_and_arrow_pos, arrow_color):
+def create_middle_and_arrow_pos(edge_list, line_list, node_pos, edge_ids=None, node_sizes=None):
+    """Returns the positions of the edges, edge_ids are the ids that a click on an edge reports (default is the edge indices)
+    node_sizes are the sizes added to BASE_NODE_SIZE of the vertices (as in create_node_traces), every arrowhead stands off
+    its destination vertex by the vertex radius, so the vertex marker does not cover it (default is no added size)
+    """
+    kept = [i for i in range(len(edge_list)) if edge_list[i][0] in node_pos and edge_list[i][1] in node_pos] # In case node_pos was filtered
+    src = np.array([node_pos[edge_list[i][0]] for i in kept], dtype=float).reshape(-1, 2)
+    dst = np.array([node_pos[edge_list[i][1]] for i in kept], dtype=float).reshape(-1, 2)
+    mid = (src + dst) / 2.0
+
+    # Batched line coordinates, every edge is x0, x1, None so a single trace draws all of them
+    Xline = np.full(3 * len(kept), None, dtype=object)
+    Yline = np.full(3 * len(kept), None, dtype=object)
+    Xline[0::3] = src[:, 0]
+    Xline[1::3] = dst[:, 0]
+    Yline[0::3] = src[:, 1]
+    Yline[1::3] = dst[:, 1]
+
+    # Arrowhead points are x0, x1 with a hidden marker at the source, so every head is rotated towards its line on the screen
+    Xhead = np.stack((src[:, 0], dst[:, 0]), axis=1).ravel()
+    Yhead = np.stack((src[:, 1], dst[:, 1]), axis=1).ravel()
+    head_size = np.tile([0, ARROW_HEAD_SIZE], len(kept))
+    standoff = np.zeros(2 * len(kept))
+    standoff[1::2] = [(BASE_NODE_SIZE + (node_sizes.get(edge_list[i][1], 0) if node_sizes is not None else 0)) / 2.0 for i in kept]
+
+    return {"Xmid": (mid[:, 0] + np.random.random(len(kept)) * 0.01).tolist(), "Ymid": mid[:, 1].tolist(),
+            "Xarrow": np.stack((src[:, 0], dst[:, 0]), axis=1).tolist(), "Yarrow": np.stack((src[:, 1], dst[:, 1]), axis=1).tolist(),
+            "Xline": Xline.tolist(), "Yline": Yline.tolist(),
+            "Xhead": Xhead.tolist(), "Yhead": Yhead.tolist(), "head_size": head_size.tolist(), "standoff": standoff.tolist(),
+            "lines": [line_list[i] for i in kept],
+            "ids": kept if edge_ids is None else [edge_ids[i] for i in kept]}
+
+def create_middle_node_trace(middle_and_arrow_pos, arrow_color, clickable=False):
     return go.Scatter(
         x=middle_and_arrow_pos["Xmid"], y=middle_and_arrow_pos["Ymid"],
         mode='markers',
         marker=dict(symbol='circle', size=ARROW_HOVER_DIAMETER, opacity=0, color=arrow_color),
         text=middle_and_arrow_pos["lines"],
+        customdata=middle_and_arrow_pos["ids"] if clickable else None, # The edge ids of the detail file
         hoverinfo='text',
         showlegend=False
         )
 
-def create_node_module_trace(Xv, Yv, node_names, node_sizes, pkg_name, is_visible=True):
+def create_edge_line_trace(middle_and_arrow_pos, arrow_color, arrow_width, is_visible=True):
+    scatter = go.Scattergl if USE_WEBGL else go.Scatter
+    return scatter(
+        x=middle_and_arrow_pos["Xline"], y=middle_and_arrow_pos["Yline"],
+        mode='lines',
+        line=dict(color=arrow_color, width=arrow_width),
+        opacity=0.7,
+        hoverinfo='skip',
+        showlegend=False,
+        visible=is_visible
+        )
+
+def create_arrowhead_trace(middle_and_arrow_pos, arrow_color, is_visible=True):
+    # Not drawn with WebGL even when USE_WEBGL is True, since Scattergl markers have no standoff
+    return go.Scatter(
+        x=middle_and_arrow_pos["Xhead"], y=middle_and_arrow_pos["Yhead"],
+        mode='markers',
+        marker=dict(symbol='arrow', size=middle_and_arrow_pos["head_size"], angleref='previous', standoff=middle_and_arrow_pos["standoff"], color=arrow_color),
+        opacity=0.7,
+        hoverinfo='skip',
+        showlegend=False,
+        visible=is_visible
+        )
+
+def create_edge_traces(middle_and_arrow_pos, import_middle_and_arrow_pos, is_visible=True):
+    return [create_edge_line_trace(middle_and_arrow_pos, ARROW_COLOR, ARROW_WIDTH, is_visible),
+            create_arrowhead_trace(middle_and_arrow_pos, ARROW_COLOR, is_visible),
+            create_edge_line_trace(import_middle_and_arrow_pos, ERROR_ARROW_COLOR, ERROR_ARROW_WIDTH, is_visible),
+            create_arrowhead_trace(import_middle_and_arrow_pos, ERROR_ARROW_COLOR, is_visible)]
+
+def create_node_module_trace(Xv, Yv, node_names, node_sizes, pkg_name, is_visible=True, show_legend=None):
     return go.Scatter(
             x=Xv, y=Yv,
             mode='markers',
             marker=dict(symbol='circle', size=node_sizes, opacity=0.8),
             name=pkg_name,
+            legendgroup=pkg_name,
             hoverinfo='text',
             text=node_names,
-            showlegend=is_visible,
+            showlegend=is_visible if show_legend is None else show_legend,
             visible=is_visible
             )
 
@@ -102,6 +294,68 @@ def create_node_label_trace(Xv, Yv, node_names, is_visible=True):
             )
    
 
+def create_shared_traces(graph, node_pos, node_sizes, edge_list, line_list, import_list, import_info_list, hidden):
+    """Creates a single set of traces for the compact output, and the visibility masks of the toggle.
+    The hidden vertices and the edges connected to them have traces of their own,
+    so hiding them only changes the visibility of these traces.
+    """
+    graph_data = []
+    is_hidden_trace = []
+    for hidden_group in (False, True):
+        group_edges = [i for i in range(len(edge_list)) if (edge_list[i][0] in hidden or edge_list[i][1] in hidden) == hidden_group]
+        group_imports = [i for i in range(len(import_list)) if (import_list[i][0] in hidden or import_list[i][1] in hidden) == hidden_group]
+        group_pos = {node: pos for node, pos in node_pos.items() if (node in hidden) == hidden_group}
+        middle_and_arrow_pos = create_middle_and_arrow_pos([edge_list[i] for i in group_edges], [line_list[i] for i in group_edges], node_pos, group_edges, node_sizes)
+        import_middle_and_arrow_pos = create_middle_and_arrow_pos([import_list[i] for i in group_imports], [import_info_list[i] for i in group_imports], node_pos,
+                                                                  node_sizes=node_sizes)
+        group_data = create_edge_traces(middle_and_arrow_pos, import_middle_and_arrow_pos)
+        group_data += [create_middle_node_trace(middle_and_arrow_pos, ARROW_COLOR, LAZY_DETAIL),
+                       create_middle_node_trace(import_middle_and_arrow_pos, ERROR_ARROW_COLOR),
+                       create_node_label_trace([pos[0] for pos in group_pos.values()], [pos[1] for pos in group_pos.values()], list(group_pos.keys()))]
+        graph_data += group_data
+        is_hidden_trace += [hidden_group] * len(group_data)
+
+    shown_trace_dict = create_node_traces(graph, {node: pos for node, pos in node_pos.items() if node not in hidden}, node_sizes)
+    hidden_trace_dict = create_node_traces(graph, {node: pos for node, pos in node_pos.items() if node in hidden}, node_sizes)
+    for (trace_dict, hidden_group) in ((shown_trace_dict, False), (hidden_trace_dict, True)):
+        for pkg in trace_dict:
+            show_legend = not hidden_group or pkg not in shown_trace_dict # A package has a single legend entry
+            graph_data.append(create_node_module_trace(trace_dict[pkg]["Xv"], trace_dict[pkg]["Yv"], trace_dict[pkg]["name"], trace_dict[pkg]["size"], pkg, show_legend=show_legend))
+            is_hidden_trace.append(hidden_group)
+
+    visibility_masks = {"full": {"visible": [True] * len(graph_data)},
+                        "secondary": {"visible": [not hidden_trace for hidden_trace in is_hidden_trace]}}
+    return (graph_data, visibility_masks)
+
+def strip_defaults(figure_dict):
+    """Removes the attributes that have their default values, and rounds the positions, before the figure is written"""
+    if isinstance(figure_dict, dict):
+        return {key: strip_defaults(value) for key, value in figure_dict.items()
+                if not (key in DEFAULT_ATTRIBUTES and value == DEFAULT_ATTRIBUTES[key])}
+    if isinstance(figure_dict, (list, tuple)):
+        return [strip_defaults(value) for value in figure_dict]
+    if isinstance(figure_dict, float):
+        return round(figure_dict, COMPACT_FLOAT_DIGITS)
+    return figure_dict
+
+def write_detail_file(html_path, graph):
+    """Writes all of the dependency info lines of the graph next to the HTML file, and returns the JavaScript that shows them on click
+    The lines are compressed with gzip and saved as a script that sets DETAIL_VARIABLE, so the browser can load it from a local file.
+    The dependency with id i in the graph is edges[i] and lines[i] in the detail file. The lines are formatted in the browser,
+    from the string indices of their triples and the line format, so every element and module name is saved once.
+    """
+    detail_path = os.path.splitext(html_path)[0] + LAZY_DETAIL_EXTENSION
+    strings = {}
+    def string_id(string):
+        return strings.setdefault(string, len(strings))
+    lines = [[string_id(line) if isinstance(line, str) else [string_id(part) for part in line] for line in edge_lines] for edge_lines in graph.lines]
+    details = json.dumps({"names": graph.names, "edges": graph.edges, "lines": lines, "strings": list(strings),
+                          "format": re.split(r"\{\d\}", core.DEPENDENCY_LINE_FORMAT)}, separators=(",", ":"))
+    with open(detail_path, 'w') as f:
+        f.write("window." + DETAIL_VARIABLE + " = \"" + base64.b64encode(gzip.compress(details.encode("utf-8"))).decode("ascii") + "\";\n")
+    return ("var DETAIL_FILE = " + json.dumps(os.path.basename(detail_path)) + ";\n" +
+            "var DETAIL_VARIABLE = " + json.dumps(DETAIL_VARIABLE) + ";\n" + DETAIL_SCRIPT)
+
 def create_axis():
     return dict(showline=False, # hide axis line, grid, ticklabels and  title
                 zeroline=False,
@@ -110,10 +364,11 @@ def create_axis():
                 title=''
     )
 
-def create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary, Xsecondary_import, Ysecondary_import, vertex_amount, edge_amount, max_dependee, dependee_amount, max_dependent, dependent_amount, full_graph_data_length, secondary_data_length, item_type):
+def create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary, Xsecondary_import, Ysecondary_import, vertex_amount, edge_amount, max_dependee, dependee_amount, max_dependent, dependent_amount, full_graph_data_length, secondary_data_length, item_type, base_trace_amount=3, batched_edges=False, visibility_masks=None, extra_info=None):
     base_annotation = dict(text=str(vertex_amount) + ' ' + item_type + ' in total<br>' + 
                                 str(edge_amount) + ' dependencies in total<br>' +  max_dependent + ' depends on a maximum of ' + str(dependent_amount) + ' ' + item_type + 
-                                '<br>Maximum of ' + str(dependee_amount) + ' ' + item_type + ' depend on ' + max_dependee,
+                                '<br>Maximum of ' + str(dependee_amount) + ' ' + item_type + ' depend on ' + max_dependee +
+                                ('' if extra_info is None else '<br>' + extra_info),
                            align='left',
                            showarrow=False,
                            xref='paper', #in relation to the edge of the graph
@@ -126,6 +381,9 @@ def create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary
                            bordercolor='black',
                            borderwidth=1)
     
+    if batched_edges: # The edges are drawn as traces, only the additional info is an annotation
+        Xarrow = Yarrow = Ximport = Yimport = Xsecondary = Ysecondary = Xsecondary_import = Ysecondary_import = []
+
     full_annotations = [dict(showarrow=True, arrowhead=5, arrowsize=ARROW_SIZE, arrowcolor=ARROW_COLOR, arrowwidth=ARROW_WIDTH,
                               ax=Xarrow[i][0], ay=Yarrow[i][0], 
                               axref='x', ayref='y',
@@ -159,14 +417,28 @@ def create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary
     secondary_annotations.append(base_annotation)
 
     my_updatemenus=[]
-    if item_type == "modules":
+    if visibility_masks is not None: # A single set of traces, the toggle only changes their visibility
+        toggle_labels = {"modules": ("Display Standalones", "Hide Standalones"), "packages": ("Display Blacklist", "Hide Blacklist")}[item_type]
+        my_updatemenus = [dict(buttons=[dict(args=[visibility_masks["full"]], label=toggle_labels[0], method="restyle"),
+                                        dict(args=[visibility_masks["secondary"]], label=toggle_labels[1], method="restyle")],
+                               direction="down",
+                               pad={"r": 5, "t": 5},
+                               showactive=True,
+                               x=TOGGLE_OPTION_X,
+                               xanchor="left",
+                               y=TOGGLE_OPTION_Y,
+                               yanchor="bottom"
+                              )
+                          ]
+
+    elif item_type == "modules":
         my_updatemenus = [dict(buttons=[                                                                                                        #middle nodes & label
-                                       dict(args=[{"visible": [True] * full_graph_data_length + [False] * secondary_data_length, "showlegend": [False, False, False] + [True] * (full_graph_data_length - 3) + [False] * secondary_data_length, "annotations" : full_annotations}],
+                                       dict(args=[{"visible": [True] * full_graph_data_length + [False] * secondary_data_length, "showlegend": [False] * base_trace_amount + [True] * (full_graph_data_length - base_trace_amount) + [False] * secondary_data_length, "annotations" : full_annotations}],
                                             label="Display Standalones",
                                             method="update"
                                             ),
                                                                                                                                                                                  #middle nodes & label
-                                       dict(args=[{"visible":[False] * full_graph_data_length + [True] * secondary_data_length, "showlegend": [False] * full_graph_data_length + [False, False, False] + [True] * (secondary_data_length - 3), "annotations" : secondary_annotations}],
+                                       dict(args=[{"visible":[False] * full_graph_data_length + [True] * secondary_data_length, "showlegend": [False] * full_graph_data_length + [False] * base_trace_amount + [True] * (secondary_data_length - base_trace_amount), "annotations" : secondary_annotations}],
                                             label="Hide Standalones",
                                             method="update"
                                             )
@@ -181,14 +453,14 @@ def create_layout(axis, Xarrow, Yarrow, Ximport, Yimport, Xsecondary, Ysecondary
                               )
                           ]
 
-    if item_type == "packages":
+    elif item_type == "packages":
         my_updatemenus = [dict(buttons=[                                                                                                        #middle nodes & label
-                                         dict(args=[{"visible": [True] * full_graph_data_length + [False] * secondary_data_length, "showlegend": [False, False, False] + [True] * (full_graph_data_length - 3) + [False] * secondary_data_length}, {"annotations" : full_annotations}],
+                                         dict(args=[{"visible": [True] * full_graph_data_length + [False] * secondary_data_length, "showlegend": [False] * base_trace_amount + [True] * (full_graph_data_length - base_trace_amount) + [False] * secondary_data_length}, {"annotations" : full_annotations}],
                                             label="Display Blacklist",
                                             method="update"
                                             ),
                                                                                                                                                                                    #middle nodes & label
-                                        dict(args=[{"visible":[False] * full_graph_data_length + [True] * secondary_data_length, "showlegend": [False] * full_graph_data_length + [False, False, False] + [True] * (secondary_data_length - 3)}, {"annotations" : secondary_annotations}],
+                                        dict(args=[{"visible":[False] * full_graph_data_length + [True] * secondary_data_length, "showlegend": [False] * full_graph_data_length + [False] * base_trace_amount + [True] * (secondary_data_length - base_trace_amount)}, {"annotations" : secondary_annotations}],
                                             label="Hide Blacklist",
                                             method="update"
                                             ),],
@@ -0,0 +1,450 @@
+"""Dependency Graph Core Structure
+
+The graph structure that draw_graph and graph_to_file build once from their input, and work from.
+Vertices are given integer ids, the adjacency is kept in CSR arrays (compressed sparse rows),
+and the vertex degrees are computed once, so building the structure takes O(V+E).
+Dependency info lines are kept as interned (dependent element, dependee element, module) triples, and are formatted
+to text only when they are displayed or exported.
+This file only uses the Python standard library.
+
+This file is required to be in the same folder as:
+    config.py
+
+This file contains the following classes:
+    * vertex - The class that corresponds with the vertex struct in the e file
+    * edge - The class that corresponds with the edge struct in the e file
+    * dependency_line - The class that corresponds with the dependency_line struct in the e file
+    * DependencyGraph - The integer indexed graph structure
+"""
+from config import *
+
+from array import array
+import sys
+
+
+###### CONSTANTS ######
+
+CYCLE_PACKAGE = "cycles" # The package of a condensed cycle whose members are in different packages
+DEPENDENCY_LINE_FORMAT = "{0} depends on {1} from {2}" # The text of a (dependent element, dependee element, module) triple
+
+#######################
+
+
+class vertex:
+    """ The class that corresponds with the vertex struct in the e file
+    Class attributes:
+    name - The displayed name of the item
+    pkg - The package the item belongs to
+    members - The names of the items of a condensed cycle, only in vertices loaded by graph_io.read_graph
+    """
+    def get_name(self):
+        """ Returns the name attribute of the vertex """
+        return self.name
+
+class edge:
+    """ The class that corresponds with the edge struct in the e file
+    Class attributes:
+    src_vertex - An object of type vertex from which the edge starts
+    dst_vertex - An object of type vertex to which the edge ends
+    lines - The dependency_line objects displayed while hovering over the edge
+    """
+    def to_tuple(self):
+        """ Returns a tuple of the vertex names of the start and end of the edge """
+        return (self.src_vertex.get_name(), self.dst_vertex.get_name())
+
+class dependency_line:
+    """ The class that corresponds with the dependency_line struct in the e file
+    Class attributes:
+    dependent - The name of the element that depends on another element
+    dependee - The name of the element it depends on
+    module - The name of the module of the dependee
+    """
+    def to_tuple(self):
+        """ Returns the (dependent, dependee, module) triple of the line """
+        return (self.dependent, self.dependee, self.module)
+
+
+class DependencyGraph:
+    """ An integer indexed dependency graph
+    Class attributes:
+    names - The vertex names, the id of a vertex is its index in this list
+    pkgs - The package of every vertex
+    ids - The id of every vertex name
+    edges - The dependencies as (source id, destination id) tuples, without duplicates
+    lines - The unique dependency info lines of every dependency in edges, as triples (or text, for lines loaded from the legacy format)
+    imports - The import dependencies as (source id, destination id) tuples, without duplicates
+    unused_imports - The imports that are not also dependencies, in the order of imports
+    out_offsets, out_targets - The edges in CSR form, the destinations of vertex i are out_targets[out_offsets[i]:out_offsets[i+1]]
+    in_offsets, in_sources - The reversed edges in CSR form
+    in_degrees - The amount of vertices that depend on every vertex
+    out_degrees - The amount of vertices that every vertex depends on
+    members - The names of the vertices that every vertex stands for when it is a condensed cycle, or None
+    weights - The amount of merged dependencies of every dependency in edges, or None
+    dependency_adjacency - The dependencies without the unused imports in CSR form and reversed, built on first use
+    """
+    def __init__(self, names, pkgs, edges, lines, imports, members=None, weights=None):
+        """
+        Parameters
+        ----------
+        names : list of string
+            The vertex names
+        pkgs : list of string
+            The package of every vertex
+        edges : list of tuple
+            The dependencies as (source id, destination id), may contain duplicates
+        lines : list of list
+            The dependency info lines of every dependency in edges, as (dependent, dependee, module) triples or as text
+        imports : list of tuple
+            The import dependencies as (source id, destination id), may contain duplicates
+        members : list of list of string, optional
+            The names of the vertices that every vertex stands for, an empty list for a vertex that is not a cycle (default is None)
+        weights : list of int, optional
+            The amount of merged dependencies of every dependency in edges, the weights of duplicates are added (default is None)
+        """
+        self.names = names
+        self.pkgs = pkgs
+        self.members = members
+        self.ids = {name: i for i, name in enumerate(names)}
+
+        edge_index = {}
+        self.edges = []
+        self.lines = []
+        self.weights = None if weights is None else []
+        for (i, (current_edge, current_lines)) in enumerate(zip(edges, lines)):
+            if current_edge not in edge_index:
+                edge_index[current_edge] = len(self.edges)
+                self.edges.append(current_edge)
+                self.lines.append({})
+                if weights is not None:
+                    self.weights.append(0)
+            self.lines[edge_index[current_edge]].update(dict.fromkeys(current_lines)) # A dict keeps the first order of the unique lines
+            if weights is not None:
+                self.weights[edge_index[current_edge]] += weights[i]
+        self.lines = [list(unique_lines) for unique_lines in self.lines]
+
+        self.imports = list(dict.fromkeys(imports))
+        self.unused_imports = [import_edge for import_edge in self.imports if import_edge not in edge_index]
+
+        all_edges = self.edges + self.unused_imports
+        (self.out_offsets, self.out_targets) = build_csr(len(names), [src for (src, dst) in all_edges], [dst for (src, dst) in all_edges])
+        (self.in_offsets, self.in_sources) = build_csr(len(names), [dst for (src, dst) in all_edges], [src for (src, dst) in all_edges])
+        self.out_degrees = array('l', [self.out_offsets[i + 1] - self.out_offsets[i] for i in range(len(names))])
+        self.in_degrees = array('l', [self.in_offsets[i + 1] - self.in_offsets[i] for i in range(len(names))])
+        self.dependency_adjacency = None
+
+    @classmethod
+    def from_objects(cls, vertices, edges, imported):
+        """ Builds the graph from the vertex and edge objects passed from the e file
+        The dependency info lines may be dependency_line objects, triples or text.
+        """
+        names = [v.name for v in vertices]
+        pkgs = [v.pkg for v in vertices]
+        ids = {name: i for i, name in enumerate(names)}
+
+        def vertex_id(v):
+            if v.name not in ids: # An edge to a vertex that was not passed
+                ids[v.name] = len(names)
+                names.append(v.name)
+                pkgs.append(v.pkg)
+            return ids[v.name]
+
+        edge_ids = [(vertex_id(e.src_vertex), vertex_id(e.dst_vertex)) for e in edges]
+        import_ids = [(vertex_id(e.src_vertex), vertex_id(e.dst_vertex)) for e in imported]
+        line_table = {}
+        return cls(names, pkgs, edge_ids, [[intern_line(line, line_table) for line in e.lines] for e in edges], import_ids)
+
+    @classmethod
+    def from_columns(cls, names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst):
+        """ Builds the graph from the parallel flat lists passed from the e file
+        lines holds three strings for every dependency info line, its dependent element, dependee element and module.
+        The dependency info lines of edge i are triples line_offsets[i] to line_offsets[i+1], the last edge's lines end at the end of lines
+        """
+        line_table = {}
+        triples = [intern_line(line, line_table) for line in zip(lines[0::3], lines[1::3], lines[2::3])]
+        line_ends = list(line_offsets[1:]) + [len(triples)]
+        return cls(list(names), list(pkgs), list(zip(edge_src, edge_dst)),
+                   [triples[start:end] for (start, end) in zip(line_offsets, line_ends)], list(zip(import_src, import_dst)))
+
+    def package_graph(self, line_cap):
+        """ Returns the graph of the packages of the vertices, built in O(V+E)
+        Dependencies between vertices of two packages are merged into a single edge by hash,
+        with up to line_cap unique lines, and its weight is the amount of merged dependencies.
+        Dependencies inside a package and imports are dropped.
+        """
+        pkg_names = list(dict.fromkeys(self.pkgs))
+        pkg_ids = {pkg: i for i, pkg in enumerate(pkg_names)}
+        vertex_pkg_ids = [pkg_ids[pkg] for pkg in self.pkgs]
+        pkg_edge_lines = {}
+        pkg_edge_weights = {}
+        for ((src, dst), lines) in zip(self.edges, self.lines):
+            pkg_edge = (vertex_pkg_ids[src], vertex_pkg_ids[dst])
+            if pkg_edge[0] != pkg_edge[1]:
+                pkg_edge_weights[pkg_edge] = pkg_edge_weights.get(pkg_edge, 0) + 1
+                merged_lines = pkg_edge_lines.setdefault(pkg_edge, {})
+                for line in lines:
+                    if len(merged_lines) >= line_cap:
+                        break
+                    merged_lines[line] = None
+        return DependencyGraph(pkg_names, list(pkg_names), list(pkg_edge_lines), [list(lines) for lines in pkg_edge_lines.values()], [],
+                               weights=list(pkg_edge_weights.values()))
+
+    def condensed(self, line_cap):
+        """ Returns the graph with every cycle (strongly connected component) replaced by a single vertex, built in O(V+E)
+        The dependencies between two cycles are merged into a single edge by hash, with up to line_cap unique lines.
+        Dependencies and imports inside a cycle are dropped.
+        """
+        (offsets, targets) = build_csr(len(self.names), [src for (src, dst) in self.edges], [dst for (src, dst) in self.edges])
+        component = strongly_connected_components(len(self.names), offsets, targets)
+        component_ids = {} # The components are numbered by their first vertex, so the vertex order is kept
+        groups = []
+        for i in range(len(self.names)):
+            if component[i] not in component_ids:
+                component_ids[component[i]] = len(groups)
+                groups.append([])
+            groups[component_ids[component[i]]].append(i)
+        vertex_component = [component_ids[c] for c in component]
+
+        names = []
+        pkgs = []
+        members = []
+        for group in groups:
+            if len(group) == 1:
+                names.append(self.names[group[0]])
+                pkgs.append(self.pkgs[group[0]])
+                members.append([])
+            else:
+                names.append("[cycle of " + str(len(group)) + ": " + self.names[group[0]] + "]")
+                group_pkgs = set(self.pkgs[i] for i in group)
+                pkgs.append(group_pkgs.pop() if len(group_pkgs) == 1 else CYCLE_PACKAGE)
+                members.append([self.names[i] for i in group])
+
+        component_edge_lines = {}
+        for ((src, dst), lines) in zip(self.edges, self.lines):
+            component_edge = (vertex_component[src], vertex_component[dst])
+            if component_edge[0] != component_edge[1]:
+                merged_lines = component_edge_lines.setdefault(component_edge, {})
+                for line in lines:
+                    if len(merged_lines) >= line_cap:
+                        break
+                    merged_lines[line] = None
+        imports = [(vertex_component[src], vertex_component[dst]) for (src, dst) in self.imports if vertex_component[src] != vertex_component[dst]]
+        return DependencyGraph(names, pkgs, list(component_edge_lines), [list(lines) for lines in component_edge_lines.values()], imports, members)
+
+    def transitive_reduction(self):
+        """ Returns the graph without the dependencies that are implied by other paths, and the amount of removed dependencies
+        The reduction is computed on the graph of the cycles, with a reachability bitset per cycle in reverse topological order,
+        so it takes O(V+E) steps of O(V/64) word operations. Dependencies inside a cycle are kept.
+        The imports of removed dependencies are removed as well, so they are not reported as unused.
+        """
+        (offsets, targets) = build_csr(len(self.names), [src for (src, dst) in self.edges], [dst for (src, dst) in self.edges])
+        component = strongly_connected_components(len(self.names), offsets, targets)
+        component_amount = max(component) + 1 if component else 0
+        component_successors = [set() for c in range(component_amount)]
+        for (src, dst) in self.edges:
+            if component[src] != component[dst]:
+                component_successors[component[src]].add(component[dst])
+
+        # A component is numbered after all of the components it reaches, and the nearest successors are checked first
+        reach = [0] * component_amount
+        kept = set()
+        for c in range(component_amount):
+            for successor in sorted(component_successors[c], reverse=True):
+                if not reach[c] >> successor & 1:
+                    kept.add((c, successor))
+                    reach[c] |= reach[successor] | (1 << successor)
+
+        kept_edges = []
+        kept_lines = []
+        removed_edges = set()
+        for ((src, dst), lines) in zip(self.edges, self.lines):
+            if component[src] == component[dst] or (component[src], component[dst]) in kept:
+                kept_edges.append((src, dst))
+                kept_lines.append(lines)
+            else:
+                removed_edges.add((src, dst))
+        imports = [import_edge for import_edge in self.imports if import_edge not in removed_edges]
+        return (DependencyGraph(self.names, self.pkgs, kept_edges, kept_lines, imports, self.members), len(removed_edges))
+
+    def subgraph(self, vertex_ids):
+        """ Returns the graph of the given vertex ids and the dependencies and imports between them, built in O(V+E)
+        The vertices keep their order, the members and weights are kept.
+        """
+        kept = sorted(vertex_ids)
+        new_ids = {old_id: i for (i, old_id) in enumerate(kept)}
+        edges = []
+        lines = []
+        weights = None if self.weights is None else []
+        for (i, ((src, dst), current_lines)) in enumerate(zip(self.edges, self.lines)):
+            if src in new_ids and dst in new_ids:
+                edges.append((new_ids[src], new_ids[dst]))
+                lines.append(current_lines)
+                if weights is not None:
+                    weights.append(self.weights[i])
+        imports = [(new_ids[src], new_ids[dst]) for (src, dst) in self.imports if src in new_ids and dst in new_ids]
+        return DependencyGraph([self.names[i] for i in kept], [self.pkgs[i] for i in kept], edges, lines, imports,
+                               None if self.members is None else [self.members[i] for i in kept], weights)
+
+    def dependency_csr(self, reverse=False):
+        """ Returns the offsets and targets arrays of the dependencies without the unused imports, reversed when reverse is True """
+        if self.dependency_adjacency is None:
+            sources = [src for (src, dst) in self.edges]
+            targets = [dst for (src, dst) in self.edges]
+            self.dependency_adjacency = (build_csr(len(self.names), sources, targets), build_csr(len(self.names), targets, sources))
+        return self.dependency_adjacency[1 if reverse else 0]
+
+    def reachable(self, sources, reverse=False, max_hops=None, include_imports=False):
+        """ Returns the set of ids of the vertices that the sources depend on, directly or indirectly, including the sources
+        When reverse is True, the vertices that depend on the sources are returned instead.
+        When include_imports is True, the unused imports are followed as well as the dependencies.
+        A breadth first search over the dependencies in O(V+E), paths are limited to max_hops dependencies when it is given.
+        """
+        if include_imports:
+            (offsets, targets) = (self.in_offsets, self.in_sources) if reverse else (self.out_offsets, self.out_targets)
+        else:
+            (offsets, targets) = self.dependency_csr(reverse)
+        visited = set(sources)
+        frontier = list(visited)
+        hops = 0
+        while frontier and (max_hops is None or hops < max_hops):
+            next_frontier = []
+            for v in frontier:
+                for w in targets[offsets[v]:offsets[v + 1]]:
+                    if w not in visited:
+                        visited.add(w)
+                        next_frontier.append(w)
+            frontier = next_frontier
+            hops += 1
+        return visited
+
+    def hover_texts(self):
+        """ Returns the hover text of every vertex, the members of a condensed cycle are listed below its name """
+        if self.members is None:
+            return self.names
+        return [name + "".join("<br>" + member for member in members[:DEPENDENCY_INFO_LINE_AMOUNT]) + ("<br>..." if len(members) > DEPENDENCY_INFO_LINE_AMOUNT else "")
+                for (name, members) in zip(self.names, self.members)]
+
+    def successors(self, i):
+        """ Returns the ids of the vertices that vertex i depends on """
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def predecessors(self, i):
+        """ Returns the ids of the vertices that depend on vertex i """
+        return self.in_sources[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+    def edge_list(self):
+        """ Returns the dependencies as (source name, destination name) tuples """
+        return [(self.names[src], self.names[dst]) for (src, dst) in self.edges]
+
+    def unused_import_list(self):
+        """ Returns the unused imports as (source name, destination name) tuples """
+        return [(self.names[src], self.names[dst]) for (src, dst) in self.unused_imports]
+
+    def import_list(self):
+        """ Returns all of the imports as (source name, destination name) tuples """
+        return [(self.names[src], self.names[dst]) for (src, dst) in self.imports]
+
+    def display_lines(self, line_amount=DEPENDENCY_INFO_LINE_AMOUNT, more_text="..."):
+        """ Returns the dependency info of every dependency, limited to line_amount lines joined by <br>, only those lines are formatted """
+        return [format_lines(current_lines, line_amount, more_text) for current_lines in self.lines]
+
+    def dependee_amounts(self):
+        """ Returns a dictionary of the amount of vertices that depend on every vertex name """
+        return dict(zip(self.names, self.in_degrees))
+
+    def max_dependee(self):
+        """ Returns the name of the first vertex that the most vertices depend on, and their amount """
+        i = max(range(len(self.names)), key=self.in_degrees.__getitem__)
+        return (self.names[i], self.in_degrees[i])
+
+    def max_dependent(self):
+        """ Returns the name of the first vertex that depends on the most vertices, and their amount """
+        i = max(range(len(self.names)), key=self.out_degrees.__getitem__)
+        return (self.names[i], self.out_degrees[i])
+
+    def standalones(self):
+        """ Returns the names of the vertices that are not related by dependency to any other """
+        return [self.names[i] for i in range(len(self.names)) if self.in_degrees[i] == 0 and self.out_degrees[i] == 0]
+
+
+def build_csr(vertex_amount, sources, targets):
+    """Returns the offsets and targets arrays of the edges, grouped by their source with a counting sort in O(V+E)"""
+    offsets = array('l', [0]) * (vertex_amount + 1)
+    for src in sources:
+        offsets[src + 1] += 1
+    for i in range(vertex_amount):
+        offsets[i + 1] += offsets[i]
+    position = array('l', offsets[:-1])
+    sorted_targets = array('l', [0]) * len(targets)
+    for (src, dst) in zip(sources, targets):
+        sorted_targets[position[src]] = dst
+        position[src] += 1
+    return (offsets, sorted_targets)
+
+def strongly_connected_components(vertex_amount, offsets, targets):
+    """Returns the component id of every vertex, with an iterative Tarjan's algorithm in O(V+E)
+    The components are numbered in reverse topological order, a component is numbered after all of the components it reaches.
+    """
+    index = array('l', [-1]) * vertex_amount
+    low = array('l', [0]) * vertex_amount
+    component = array('l', [-1]) * vertex_amount
+    stack = []
+    component_amount = 0
+    counter = 0
+    for root in range(vertex_amount):
+        if index[root] != -1:
+            continue
+        call_stack = [(root, offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        while call_stack:
+            (v, next_edge) = call_stack[-1]
+            if next_edge < offsets[v + 1]:
+                call_stack[-1] = (v, next_edge + 1)
+                w = targets[next_edge]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    call_stack.append((w, offsets[w]))
+                elif component[w] == -1: # w is on the stack
+                    low[v] = min(low[v], index[w])
+                continue
+            call_stack.pop()
+            if call_stack:
+                parent = call_stack[-1][0]
+                low[parent] = min(low[parent], low[v])
+            if low[v] == index[v]:
+                while True:
+                    w = stack.pop()
+                    component[w] = component_amount
+                    if w == v:
+                        break
+                component_amount += 1
+    return component
+
+def intern_line(line, line_table):
+    """Returns a dependency info line as a triple of interned strings, which is shared with the equal lines in line_table
+    A dependency_line object is converted to a triple, and a line of text is kept as it is.
+    """
+    if isinstance(line, str):
+        return line
+    if not isinstance(line, tuple):
+        line = (line.dependent, line.dependee, line.module)
+    if line not in line_table:
+        line_table[line] = tuple(sys.intern(part) for part in line)
+    return line_table[line]
+
+def format_line(line):
+    """Returns the text of a dependency info line"""
+    return line if isinstance(line, str) else DEPENDENCY_LINE_FORMAT.format(*line)
+
+def format_lines(lines, line_amount=DEPENDENCY_INFO_LINE_AMOUNT, more_text="..."):
+    """Returns the dependency info lines joined by <br>, limited to line_amount lines
+    Only the displayed lines are formatted. When lines are left out, more_text is added as the last line,
+    "{amount}" in it is replaced by the amount of all lines.
+    """
+    text_lines = [format_line(line) for line in lines[:line_amount]]
+    if len(lines) > line_amount:
+        text_lines.append(more_text.replace("{amount}", str(len(lines))))
+    return "<br>".join(text_lines)
@@ -0,0 +1,213 @@
+"""Dependency Graph Diff
+
+Compares two graph info files written by graph_to_file, for example after two integration builds.
+Both graphs are loaded into hashed sets of modules, dependencies and unused imports, so the diff takes O(V+E).
+The diff is written as a text report, and can be drawn as an HTML file that holds only the changed modules,
+the changed dependencies and the dependencies around them.
+Files in both the structured and the legacy text formats can be compared.
+
+Usage:
+    python graph_diff.py <old file> <new file> [--no-html] [--no-browser]
+
+This file is required to be in the same folder as:
+    graph_aux.py
+    graph_core.py
+    graph_io.py
+    config.py
+
+This file contains the following functions:
+    * read_graph_file - Loads a file written by graph_to_file in either format into a DependencyGraph
+    * diff_graphs - Returns the added and removed modules, dependencies and unused imports between two graphs
+    * diff_files - Writes the diff of two graph info files to a text report, and draws it in an HTML file
+"""
+from config import *
+import graph_aux as aux
+import graph_core as core
+import graph_io
+
+from datetime import datetime as datetime
+import plotly.graph_objects as go
+import plotly.io as pio
+import argparse
+import ast
+import os
+
+
+###### CONSTANTS ######
+
+DIFF_CATEGORIES = ["added_modules", "removed_modules", "added_dependencies", "removed_dependencies", "added_unused_imports", "removed_unused_imports"]
+
+#######################
+
+
+def read_graph_file(path):
+    """Loads a file written by graph_to_file, in the structured or the legacy format, into a DependencyGraph"""
+    with graph_io.open_file(path, "r") as f:
+        is_structured = f.read(1) == "{"
+    if is_structured:
+        graph = graph_io.read_graph(path)
+        return core.DependencyGraph.from_objects(graph["vertices"], graph["edges"], graph["imported"])
+    return read_legacy_text(path)
+
+def read_legacy_text(path):
+    """Loads a file in the legacy format, whose sections are a title line followed by the text of a Python value
+    The legacy format has no packages, and its dependency info lines are limited to DEPENDENCY_INFO_LINE_AMOUNT.
+    """
+    sections = {}
+    with open(path) as f:
+        lines = f.read().split("\n")
+    for i in range(len(lines) - 1):
+        if lines[i].endswith(":") and not lines[i].startswith(("[", "{")):
+            sections[lines[i][:-1]] = ast.literal_eval(lines[i + 1])
+    names = sections["Vertices"]
+    ids = {name: i for i, name in enumerate(names)}
+    return core.DependencyGraph(names, [""] * len(names), [(ids[src], ids[dst]) for (src, dst) in sections["Edges"]],
+                                [info.split("<br>") if info else [] for info in sections["Dependency info"]],
+                                [(ids[src], ids[dst]) for (src, dst) in sections["Imports"]])
+
+def diff_graphs(old_graph, new_graph):
+    """Returns the differences between two graphs, in O(V+E)
+
+    Returns
+    -------
+    dict
+        For every one of DIFF_CATEGORIES, a sorted list of the added or removed module names,
+        or of the added or removed (source name, destination name) tuples
+    """
+    (old_modules, new_modules) = (set(old_graph.names), set(new_graph.names))
+    (old_edges, new_edges) = (set(old_graph.edge_list()), set(new_graph.edge_list()))
+    (old_imports, new_imports) = (set(old_graph.unused_import_list()), set(new_graph.unused_import_list()))
+    return {"added_modules": sorted(new_modules - old_modules),
+            "removed_modules": sorted(old_modules - new_modules),
+            "added_dependencies": sorted(new_edges - old_edges),
+            "removed_dependencies": sorted(old_edges - new_edges),
+            "added_unused_imports": sorted(new_imports - old_imports),
+            "removed_unused_imports": sorted(old_imports - new_imports)}
+
+def write_report(path, diff, old_path, new_path, old_graph, new_graph):
+    with open(path, 'w') as f:
+        for (title, file_path, graph) in (("Old", old_path, old_graph), ("New", new_path, new_graph)):
+            f.write(title + ": " + file_path + " (" + str(len(graph.names)) + " modules, " + str(len(graph.edges)) + " dependencies, " +
+                    str(len(graph.unused_imports)) + " unused imports)\n")
+        f.write("\n")
+        for category in DIFF_CATEGORIES:
+            f.write(category.replace("_", " ").capitalize() + " (" + str(len(diff[category])) + "):\n")
+            for item in diff[category]:
+                f.write("    " + (item if isinstance(item, str) else item[0] + " -> " + item[1]) + "\n")
+            f.write("\n")
+
+def get_edge_lines(graph, edge_list):
+    """Returns the dependency info of every (source name, destination name) dependency of the graph in edge_list"""
+    edge_lines = dict(zip(graph.edges, graph.lines))
+    return [core.format_lines(edge_lines[(graph.ids[src], graph.ids[dst])]) for (src, dst) in edge_list]
+
+def create_diff_figure(diff, old_graph, new_graph):
+    """Returns the traces and layout of a figure of the changed modules and dependencies, and the unchanged dependencies around them"""
+    changed_modules = set(diff["added_modules"]).union(diff["removed_modules"])
+    for category in DIFF_CATEGORIES[2:]:
+        for (src, dst) in diff[category]:
+            changed_modules.update((src, dst))
+
+    # The unchanged dependencies of the changed modules, found through the adjacency of both graphs
+    unchanged_edges = set(old_graph.edge_list()).intersection(new_graph.edge_list())
+    context_edges = set()
+    for graph in (old_graph, new_graph):
+        for name in changed_modules:
+            if name in graph.ids:
+                i = graph.ids[name]
+                context_edges.update((name, graph.names[j]) for j in graph.successors(i))
+                context_edges.update((graph.names[j], name) for j in graph.predecessors(i))
+    context_edges = sorted(context_edges.intersection(unchanged_edges))
+
+    vertex_list = sorted(changed_modules.union(*context_edges))
+    all_edges = context_edges + diff["added_dependencies"] + diff["removed_dependencies"] + diff["added_unused_imports"] + diff["removed_unused_imports"]
+    node_pos = aux.create_pos(vertex_list, all_edges)
+
+    edge_groups = [("unchanged dependency", context_edges, get_edge_lines(new_graph, context_edges), ARROW_COLOR, ARROW_WIDTH, "solid"),
+                   ("added dependency", diff["added_dependencies"], get_edge_lines(new_graph, diff["added_dependencies"]), DIFF_ADDED_COLOR, ERROR_ARROW_WIDTH, "solid"),
+                   ("removed dependency", diff["removed_dependencies"], get_edge_lines(old_graph, diff["removed_dependencies"]), DIFF_REMOVED_COLOR, ERROR_ARROW_WIDTH, "solid"),
+                   ("added unused import", diff["added_unused_imports"], [""] * len(diff["added_unused_imports"]), DIFF_ADDED_COLOR, ERROR_ARROW_WIDTH, "dot"),
+                   ("removed unused import", diff["removed_unused_imports"], [""] * len(diff["removed_unused_imports"]), DIFF_REMOVED_COLOR, ERROR_ARROW_WIDTH, "dot")]
+    graph_data = []
+    for (title, edge_list, line_list, color, width, dash) in edge_groups:
+        middle_and_arrow_pos = aux.create_middle_and_arrow_pos(edge_list, [src + " -> " + dst + "<br>" + title + ("<br>" + lines if lines else "")
+                                                                           for ((src, dst), lines) in zip(edge_list, line_list)], node_pos)
+        line_trace = aux.create_edge_line_trace(middle_and_arrow_pos, color, width)
+        line_trace.update(line_dash=dash)
+        graph_data += [line_trace, aux.create_arrowhead_trace(middle_and_arrow_pos, color), aux.create_middle_node_trace(middle_and_arrow_pos, color)]
+    graph_data.append(aux.create_node_label_trace([node_pos[node][0] for node in vertex_list], [node_pos[node][1] for node in vertex_list], vertex_list))
+
+    added_modules = set(diff["added_modules"])
+    removed_modules = set(diff["removed_modules"])
+    node_groups = [("added modules", [node for node in vertex_list if node in added_modules], DIFF_ADDED_COLOR),
+                   ("removed modules", [node for node in vertex_list if node in removed_modules], DIFF_REMOVED_COLOR),
+                   ("unchanged modules", [node for node in vertex_list if node not in added_modules and node not in removed_modules], ARROW_COLOR)]
+    for (title, nodes, color) in node_groups:
+        node_trace = aux.create_node_module_trace([node_pos[node][0] for node in nodes], [node_pos[node][1] for node in nodes], nodes, BASE_NODE_SIZE, title)
+        node_trace.update(marker_color=color)
+        graph_data.append(node_trace)
+
+    summary = "<br>".join(str(len(diff[category])) + " " + category.replace("_", " ") for category in DIFF_CATEGORIES)
+    my_layout = go.Layout(autosize=True,
+                          xaxis=go.layout.XAxis(aux.create_axis()),
+                          yaxis=go.layout.YAxis(aux.create_axis()),
+                          hovermode='closest',
+                          hoverlabel=dict(font_size=TEXT_SIZE),
+                          font=dict(size=TEXT_SIZE),
+                          legend=dict(itemclick=False, itemdoubleclick=False),
+                          annotations=[dict(text=summary, align='left', showarrow=False, xref='paper', yref='paper', xanchor='center', yanchor='bottom',
+                                            x=ADDITIONAL_INFO_X, y=ADDITIONAL_INFO_Y, font=dict(size=TEXT_SIZE), bordercolor='black', borderwidth=1)])
+    return (graph_data, my_layout)
+
+def diff_files(old_path, new_path, to_html=True, open_browser=True):
+    """Writes the diff of two graph info files to a text report, and draws the changed part of the graph
+
+    Parameters
+    ----------
+    old_path, new_path : string
+        The paths of the compared files, written by graph_to_file in either format
+    to_html : bool, optional
+        When True, the changed part of the graph is drawn in an HTML file (default is True)
+    open_browser : bool, optional
+        When True, the HTML file is opened in the browser (default is True)
+
+    Returns
+    -------
+    tuple
+        The path of the report, and the path of the HTML file or None
+    """
+    old_graph = read_graph_file(old_path)
+    new_graph = read_graph_file(new_path)
+    diff = diff_graphs(old_graph, new_graph)
+
+    base_name = "diff-" + os.path.basename(graph_io.remove_extension(old_path)) + "-" + os.path.basename(graph_io.remove_extension(new_path))
+    folder_path = os.path.join(os.getcwd(), TEXT_FILE_FOLDER)
+    os.makedirs(folder_path, exist_ok=True)
+    report_path = os.path.join(folder_path, base_name + TEXT_FILE_EXTENSION)
+    write_report(report_path, diff, old_path, new_path, old_graph, new_graph)
+    print("The graph diff has been written to a text file at the following path:")
+    print(report_path)
+
+    html_path = None
+    if to_html:
+        if not any(diff.values()):
+            print("The graphs are identical, the diff is not drawn")
+        else:
+            (graph_data, my_layout) = create_diff_figure(diff, old_graph, new_graph)
+            folder_path = os.path.join(os.getcwd(), HTML_FILE_FOLDER)
+            os.makedirs(folder_path, exist_ok=True)
+            html_path = os.path.join(folder_path, base_name + "-" + datetime.now().strftime("%Y_%m_%d_%H_%M") + ".html")
+            pio.write_html(go.Figure(data=graph_data, layout=my_layout), html_path, auto_open=False, config={"displayModeBar":False, "responsive":True})
+            if open_browser:
+                aux.display_in_browser("file://" + html_path)
+    return (report_path, html_path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compares two graph info files written by graph_to_file")
+    parser.add_argument("old_path", help="The graph info file of the earlier build")
+    parser.add_argument("new_path", help="The graph info file of the later build")
+    parser.add_argument("--no-html", action="store_true", help="Only write the text report")
+    parser.add_argument("--no-browser", action="store_true", help="Do not open the HTML file in the browser")
+    args = parser.parse_args()
+    diff_files(args.old_path, args.new_path, not args.no_html, not args.no_browser)
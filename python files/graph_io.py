@@ -0,0 +1,177 @@
+"""Dependency Graph File Format
+
+Reads and writes graph info in a structured format that can be loaded back without Specman.
+The file is in JSON Lines format (one JSON value per line), optionally compressed with gzip:
+    * A header object: {"format": "dependency-graph", "version": 1, "item_type": ..., "item_name": ..., "created": ..., "removed_edges": ...}
+    * String table entries: {"s": <string>}, numbered by their order in the file.
+      Every string is written once, before the first record that uses it.
+    * Vertices: {"v": [<name string index>, <package string index>]}, numbered by their order in the file.
+      A condensed cycle also has "m": [<member name string index>, ...]
+    * Import dependencies: {"i": [<source vertex index>, <destination vertex index>]}
+    * Dependencies: {"e": [<source vertex index>, <destination vertex index>], "l": [<dependency info line>, ...]}
+      A line is [<dependent string index>, <dependee string index>, <module string index>], or the string index of its text
+      for lines loaded from the legacy format. In version 1 files, a line is its text.
+The records are written one at a time, so the whole text is never built in memory,
+and the element and module names of the dependency info lines are written once.
+
+This file is required to be in the same folder as:
+    graph_core.py
+    config.py
+
+This file contains the following functions:
+    * write_graph - Writes graph info to a file in the structured format
+    * read_graph - Loads a file written by write_graph back into vertex and edge objects
+    * remove_extension - Returns the path of a graph info file without its extension
+"""
+from config import STRUCTURED_FILE_EXTENSION, TEXT_FILE_EXTENSION
+from graph_core import vertex, edge, intern_line
+
+from datetime import datetime as datetime
+import gzip
+import json
+
+
+###### CONSTANTS ######
+
+FORMAT_NAME = "dependency-graph"
+FORMAT_VERSION = 2
+GZIP_MAGIC = b"\x1f\x8b"
+
+#######################
+
+
+class GraphWriter:
+    """ Writes the records of a single graph file
+    Class attributes:
+    f - The open text file
+    strings - The index of every string that was already written to the string table
+    vertex_ids - The index of every vertex name that was already written
+    """
+    def __init__(self, f, item_name, item_type, removed_edges=0):
+        self.f = f
+        self.strings = {}
+        self.vertex_ids = {}
+        self.write_record({"format": FORMAT_NAME, "version": FORMAT_VERSION, "item_type": item_type, "item_name": item_name,
+                           "created": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), "removed_edges": removed_edges})
+
+    def write_record(self, record):
+        self.f.write(json.dumps(record, separators=(",", ":")) + "\n")
+
+    def string_id(self, string):
+        """ Returns the string table index of the string, and writes it to the table if it is new """
+        if string not in self.strings:
+            self.strings[string] = len(self.strings)
+            self.write_record({"s": string})
+        return self.strings[string]
+
+    def write_vertex(self, name, pkg, members=None):
+        if name not in self.vertex_ids:
+            self.vertex_ids[name] = len(self.vertex_ids)
+            record = {"v": [self.string_id(name), self.string_id(pkg)]}
+            if members:
+                record["m"] = [self.string_id(member) for member in members]
+            self.write_record(record)
+
+    def write_import(self, src_name, dst_name):
+        self.write_record({"i": [self.vertex_ids[src_name], self.vertex_ids[dst_name]]})
+
+    def write_edge(self, src_name, dst_name, lines):
+        self.write_record({"e": [self.vertex_ids[src_name], self.vertex_ids[dst_name]],
+                           "l": [self.string_id(line) if isinstance(line, str) else [self.string_id(part) for part in line] for line in lines]})
+
+
+def remove_extension(path):
+    """Returns the path of a graph info file without its structured, compressed or legacy extension
+    Only the known extension is removed, since module names (and so the file names) may contain dots.
+    """
+    for extension in (STRUCTURED_FILE_EXTENSION + ".gz", STRUCTURED_FILE_EXTENSION, TEXT_FILE_EXTENSION):
+        if path.endswith(extension):
+            return path[:-len(extension)]
+    return path
+
+def open_file(path, mode, compress=False):
+    """Opens a graph file as text, compressed files are detected by their content when reading"""
+    if "r" in mode:
+        with open(path, "rb") as f:
+            compress = f.read(2) == GZIP_MAGIC
+    if compress:
+        return gzip.open(path, mode + "t", encoding="utf-8")
+    return open(path, mode, encoding="utf-8")
+
+def write_graph(path, graph, item_name, item_type, compress=False, removed_edges=0):
+    """Writes graph info to a file in the structured format
+
+    Parameters
+    ----------
+    path : string
+        The path of the created file
+    graph : DependencyGraph
+        The graph, with all of its import dependencies
+    item_name : string
+        The name of the base entity from which the graph was created
+    item_type : string
+        The entity type of the graph
+    compress : bool, optional
+        When True, the file is compressed with gzip (default is False)
+    removed_edges : int, optional
+        The amount of edges that were removed by graph reductions before the graph was written (default is 0)
+    """
+    with open_file(path, "w", compress) as f:
+        writer = GraphWriter(f, item_name, item_type, removed_edges)
+        for (i, (name, pkg)) in enumerate(zip(graph.names, graph.pkgs)):
+            writer.write_vertex(name, pkg, graph.members[i] if graph.members is not None else None)
+        for (src, dst) in graph.imports:
+            writer.write_import(graph.names[src], graph.names[dst])
+        for ((src, dst), lines) in zip(graph.edges, graph.lines):
+            writer.write_edge(graph.names[src], graph.names[dst], lines)
+
+def read_graph(path):
+    """Loads a file written by write_graph
+
+    Parameters
+    ----------
+    path : string
+        The path of the file, it may be compressed with gzip
+
+    Returns
+    -------
+    dict
+        "item_name" and "item_type" - The base entity of the graph
+        "removed_edges" - The amount of edges that were removed by graph reductions
+        "vertices" - list of vertex
+        "edges" - list of edge, with the dependency info lines as (dependent, dependee, module) triples or as text
+        "imported" - list of edge, with no lines
+    """
+    strings = []
+    line_table = {}
+    graph = {"vertices": [], "edges": [], "imported": []}
+    with open_file(path, "r") as f:
+        header = json.loads(f.readline())
+        if header.get("format") != FORMAT_NAME or header.get("version", 0) > FORMAT_VERSION:
+            raise ValueError("Not a dependency graph file of a supported version: " + path)
+        graph["item_name"] = header["item_name"]
+        graph["item_type"] = header["item_type"]
+        graph["removed_edges"] = header.get("removed_edges", 0)
+        version = header.get("version", 0)
+        for line in f:
+            record = json.loads(line)
+            if "s" in record:
+                strings.append(record["s"])
+            elif "v" in record:
+                current_vertex = vertex()
+                current_vertex.name = strings[record["v"][0]]
+                current_vertex.pkg = strings[record["v"][1]]
+                current_vertex.members = [strings[member] for member in record.get("m", [])]
+                graph["vertices"].append(current_vertex)
+            else:
+                current_edge = edge()
+                (src, dst) = record["e"] if "e" in record else record["i"]
+                current_edge.src_vertex = graph["vertices"][src]
+                current_edge.dst_vertex = graph["vertices"][dst]
+                if version < 2:
+                    current_edge.lines = record.get("l", [])
+                else:
+                    current_edge.lines = [strings[line] if isinstance(line, int) else intern_line(tuple(strings[part] for part in line), line_table)
+                                          for line in record.get("l", [])]
+                graph["edges" if "e" in record else "imported"].append(current_edge)
+    return graph
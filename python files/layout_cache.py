@@ -0,0 +1,106 @@
+"""Dependency Graph Layout Cache
+
+These functions are not public, they are for inner use of the Dependency Graph tool.
+The node positions of every drawn graph are saved in LAYOUT_CACHE_FOLDER, keyed by a fingerprint of its vertices and edges.
+An unchanged graph reuses its saved positions, and a changed graph starts from the most similar saved layout.
+This file is required to be in the same folder as:
+    config.py
+"""
+from config import *
+
+import hashlib
+import json
+import time
+import os
+
+INDEX_FILE_NAME = "index.json" # Maps each saved fingerprint to the time it was last used
+
+
+def fingerprint(vertex_list, edge_list, engine_name):
+    digest = hashlib.sha1(engine_name.encode() + b"\0")
+    for name in sorted(vertex_list):
+        digest.update(name.encode() + b"\0")
+    digest.update(b"\1")
+    for (src, dst) in sorted(set(edge_list)):
+        digest.update(src.encode() + b"\0" + dst.encode() + b"\0")
+    return digest.hexdigest()
+
+def get_folder():
+    folder_path = os.path.join(os.getcwd(), LAYOUT_CACHE_FOLDER)
+    os.makedirs(folder_path, exist_ok=True)
+    return folder_path
+
+def load_index(folder_path):
+    try:
+        with open(os.path.join(folder_path, INDEX_FILE_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_index(folder_path, index):
+    with open(os.path.join(folder_path, INDEX_FILE_NAME), 'w') as f:
+        json.dump(index, f)
+
+def load_entry(folder_path, key):
+    try:
+        with open(os.path.join(folder_path, key + ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_layout(key):
+    """Returns the saved positions of the graph with the given fingerprint, or None if it was not saved"""
+    if LAYOUT_CACHE_SIZE <= 0:
+        return None
+    folder_path = get_folder()
+    index = load_index(folder_path)
+    if key not in index:
+        return None
+    entry = load_entry(folder_path, key)
+    if entry is None:
+        return None
+    index[key] = time.time()
+    save_index(folder_path, index)
+    return entry["pos"]
+
+def find_closest_layout(vertex_list, engine_name):
+    """Returns the saved entry of the given layout engine that shares the most vertices with the given graph,
+    out of the most recently used ones"""
+    if LAYOUT_CACHE_SIZE <= 0:
+        return None
+    folder_path = get_folder()
+    index = load_index(folder_path)
+    vertex_set = set(vertex_list)
+    best_entry = None
+    best_score = 0
+    for key in sorted(index, key=index.get, reverse=True)[:LAYOUT_CACHE_CANDIDATES]:
+        entry = load_entry(folder_path, key)
+        if entry is None or entry.get("engine") != engine_name:
+            continue
+        shared = len(vertex_set.intersection(entry["pos"]))
+        score = shared / len(vertex_set.union(entry["pos"])) # Jaccard similarity of the vertex sets
+        if score > best_score:
+            best_entry = entry
+            best_score = score
+    return best_entry
+
+def save_layout(key, edge_list, positions, k, engine_name):
+    """Saves the positions of a graph with its layout engine and the optimal distance between nodes in their scale,
+    and removes the least recently used layouts above LAYOUT_CACHE_SIZE"""
+    if LAYOUT_CACHE_SIZE <= 0:
+        return
+    folder_path = get_folder()
+    with open(os.path.join(folder_path, key + ".json"), 'w') as f:
+        json.dump({"engine": engine_name,
+                   "k": float(k),
+                   "edges": [list(e) for e in set(edge_list)],
+                   "pos": {node: [float(pos[0]), float(pos[1])] for node, pos in positions.items()}}, f)
+    index = load_index(folder_path)
+    index[key] = time.time()
+    for old_key in sorted(index, key=index.get)[:max(0, len(index) - LAYOUT_CACHE_SIZE)]:
+        del index[old_key]
+        try:
+            os.remove(os.path.join(folder_path, old_key + ".json"))
+        except OSError:
+            pass
+    save_index(folder_path, index)
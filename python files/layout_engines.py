@@ -0,0 +1,126 @@
+"""Dependency Graph Layout Engines
+
+These functions are not public, they are for inner use of the Dependency Graph tool.
+Every engine receives a nx.DiGraph and the optimal distance between nodes, and returns unscaled node positions.
+The engine is selected by the LAYOUT_ENGINE config variable, or by the graph size when it is "auto".
+This file is required to be in the same folder as:
+    config.py
+"""
+from config import *
+
+import networkx as nx
+import numpy as np
+
+
+def spring_layout(G, k, pos=None, fixed=None, iterations=50):
+    """The networkx Fruchterman-Reingold layout, computes the forces between every pair of nodes"""
+    return nx.spring_layout(G, k=k, iterations=iterations, pos=pos, fixed=fixed, scale=None)
+
+def sparse_force_layout(G, k, pos=None, fixed=None, iterations=50):
+    """A Fruchterman-Reingold layout that only computes the repulsion between nodes closer than 2k (the grid variant).
+    The close pairs are found with a k-d tree, so no V x V array is built and an iteration takes about O(V+E)
+    """
+    from scipy.spatial import cKDTree
+
+    nodes = list(G)
+    if len(nodes) <= 1:
+        return {node: np.zeros(2) for node in nodes}
+    index = {node: i for i, node in enumerate(nodes)}
+    edge_arr = np.array([(index[src], index[dst]) for (src, dst) in G.edges() if src != dst], dtype=np.int64).reshape(-1, 2)
+
+    # The initial domain keeps about one node per k x k square, so the amount of close pairs stays linear
+    dom_size = k * np.sqrt(len(nodes))
+    pos_arr = np.random.random((len(nodes), 2)) * dom_size
+    if pos is not None:
+        for node, node_pos in pos.items():
+            if node in index:
+                pos_arr[index[node]] = node_pos
+    movable = np.ones(len(nodes), dtype=bool)
+    if fixed is not None:
+        movable[[index[node] for node in fixed if node in index]] = False
+
+    t = 0.1 * max(np.ptp(pos_arr[:, 0]), np.ptp(pos_arr[:, 1]), k) # The largest step allowed, cooled linearly
+    dt = t / (iterations + 1)
+    for iteration in range(iterations):
+        displacement = np.zeros_like(pos_arr)
+
+        pairs = cKDTree(pos_arr).query_pairs(2 * k, output_type='ndarray')
+        delta = pos_arr[pairs[:, 0]] - pos_arr[pairs[:, 1]]
+        distance = np.clip(np.linalg.norm(delta, axis=1), 0.01, None)
+        force = delta * (k * k / distance ** 2)[:, None]
+        for dim in range(2):
+            displacement[:, dim] += np.bincount(pairs[:, 0], force[:, dim], len(nodes)) - np.bincount(pairs[:, 1], force[:, dim], len(nodes))
+
+        delta = pos_arr[edge_arr[:, 0]] - pos_arr[edge_arr[:, 1]]
+        distance = np.linalg.norm(delta, axis=1)
+        force = delta * (distance / k)[:, None]
+        for dim in range(2):
+            displacement[:, dim] += np.bincount(edge_arr[:, 1], force[:, dim], len(nodes)) - np.bincount(edge_arr[:, 0], force[:, dim], len(nodes))
+
+        length = np.clip(np.linalg.norm(displacement, axis=1), 0.01, None)
+        step = displacement * (np.minimum(length, t) / length)[:, None]
+        pos_arr[movable] += step[movable]
+        t -= dt
+    return {node: pos_arr[i] for i, node in enumerate(nodes)}
+
+def hierarchical_layout(G, k, pos=None, fixed=None, iterations=None):
+    """A layered layout in linear time. Strongly connected components are condensed, and the components are
+    assigned to topological layers, so every module is drawn above the modules it depends on.
+    Inside a layer, the nodes are ordered by the mean position of the nodes that depend on them.
+    The pos, fixed and iterations parameters are ignored, the layout is deterministic.
+    """
+    condensed = nx.condensation(G)
+    x_pos = {}
+    result = {}
+    for (layer, components) in enumerate(nx.topological_generations(condensed)):
+        barycenter = {}
+        for c in components:
+            predecessors = [x_pos[p] for p in condensed.predecessors(c)]
+            barycenter[c] = sum(predecessors) / len(predecessors) if predecessors else 0.0
+        layer_nodes = [(c, node) for c in sorted(components, key=barycenter.get) for node in sorted(condensed.nodes[c]["members"])]
+        for (i, (c, node)) in enumerate(layer_nodes):
+            result[node] = np.array([(i - (len(layer_nodes) - 1) / 2.0) * k, -layer * k])
+        for c in components:
+            x_pos[c] = np.mean([result[node][0] for node in condensed.nodes[c]["members"]])
+    return result
+
+
+###### CONSTANTS ######
+
+LAYOUT_ENGINES = {"spring": spring_layout, "sparse_force": sparse_force_layout, "hierarchical": hierarchical_layout}
+WARM_START_ENGINES = ["spring", "sparse_force"] # Engines that can relax some nodes around the fixed positions of others
+SPRING_SCIPY_THRESHOLD = 500 # The networkx spring layout uses scipy for graphs with at least this amount of nodes
+
+#######################
+
+scipy_installed = None # Checked on the first use of an engine that needs scipy
+
+
+def is_scipy_installed():
+    """Returns True when scipy, needed by the sparse force layout and the spring layout of large graphs, can be imported"""
+    global scipy_installed
+    if scipy_installed is None:
+        try:
+            import scipy.spatial
+            scipy_installed = True
+        except ImportError:
+            scipy_installed = False
+            print("\t*** Note: scipy is not installed, graphs with at least", SPRING_SCIPY_THRESHOLD, "vertices use the hierarchical layout")
+    return scipy_installed
+
+def select_engine(vertex_amount):
+    """Returns the name of the layout engine for a graph with the given amount of vertices
+    The engines that need scipy are replaced by the hierarchical layout when scipy is not installed.
+    """
+    if LAYOUT_ENGINE != "auto":
+        engine_name = LAYOUT_ENGINE
+    elif vertex_amount > HIERARCHICAL_LAYOUT_THRESHOLD:
+        engine_name = "hierarchical"
+    elif vertex_amount > SPARSE_LAYOUT_THRESHOLD:
+        engine_name = "sparse_force"
+    else:
+        engine_name = "spring"
+    needs_scipy = engine_name == "sparse_force" or (engine_name == "spring" and vertex_amount >= SPRING_SCIPY_THRESHOLD)
+    if needs_scipy and not is_scipy_installed():
+        return "hierarchical"
+    return engine_name
@@ -0,0 +1,117 @@
+"""Dependency Graph Pipeline Profiling
+
+Measures the stages of creating a graph file, when PROFILE_PIPELINE is True in the config file
+or the PROFILE_ENV_VARIABLE environment variable is set to a value other than 0.
+The wall time and the tracemalloc peak memory of every stage are recorded, with the amounts of vertices and edges
+and the size of the created file. The report is printed, and appended as a JSON line to PROFILE_LOG_FILE
+in the folder of the created file.
+When profiling is disabled, the stages are not measured and tracemalloc is not started.
+A Profile is used as a context manager, so tracemalloc is stopped even when creating the graph raises an exception.
+
+This file is required to be in the same folder as:
+    config.py
+
+This file contains the following classes:
+    * Profile - The measurements of creating a single graph file
+"""
+from config import *
+
+from datetime import datetime as datetime
+import tracemalloc
+import json
+import time
+import os
+
+
+###### CONSTANTS ######
+
+PROFILE_ENV_VARIABLE = "DEPENDENCY_GRAPH_PROFILE"
+
+#######################
+
+
+def is_enabled():
+    return PROFILE_PIPELINE or os.environ.get(PROFILE_ENV_VARIABLE, "0") not in ("", "0")
+
+
+class Profile:
+    """ The measurements of creating a single graph file
+    Class attributes:
+    operation - The name of the called function, such as draw_graph
+    item_name, item_type - The base entity of the graph
+    enabled - When False, nothing is measured
+    stages - The measured stages as (name, seconds, peak memory in MB) tuples, in the order they ran
+    current_stage - The name and start time of the stage that is measured, or None
+    counts - The amounts of vertices and edges of the graph
+    """
+    def __init__(self, operation, item_name, item_type):
+        self.operation = operation
+        self.item_name = item_name
+        self.item_type = item_type
+        self.enabled = is_enabled()
+        self.stages = []
+        self.counts = {}
+        self.start_time = time.perf_counter()
+        self.current_stage = None
+        self.started_tracing = False
+        if self.enabled and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        self.stop()
+
+    def stop(self):
+        """ Stops tracemalloc if this profile started it, without a report """
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def stage(self, name):
+        """ Ends the current stage, and starts to measure the stage called name """
+        if not self.enabled:
+            return
+        self.end_stage()
+        if hasattr(tracemalloc, "reset_peak"): # Python 3.9, older versions report the peak since the profile started
+            tracemalloc.reset_peak()
+        self.current_stage = (name, time.perf_counter())
+
+    def end_stage(self):
+        """ Ends the current stage, the time until the next stage starts is not a part of any stage """
+        if self.enabled and self.current_stage is not None:
+            (name, start) = self.current_stage
+            self.stages.append((name, time.perf_counter() - start, tracemalloc.get_traced_memory()[1] / 2 ** 20))
+            self.current_stage = None
+
+    def set_counts(self, graph):
+        """ Records the amounts of vertices, dependencies and unused imports of a DependencyGraph """
+        if self.enabled:
+            self.counts = {"vertices": len(graph.names), "edges": len(graph.edges), "unused_imports": len(graph.unused_imports)}
+
+    def finish(self, output_path=None):
+        """ Prints the report and appends it to PROFILE_LOG_FILE in the folder of output_path (default is the HTML folder) """
+        if not self.enabled:
+            return
+        self.end_stage()
+        self.stop()
+        total = time.perf_counter() - self.start_time
+        output_size = os.path.getsize(output_path) if output_path is not None and os.path.exists(output_path) else None
+
+        print("Pipeline profile of " + self.operation + " " + self.item_type + "-" + self.item_name + ": " +
+              ", ".join(str(amount) + " " + name.replace("_", " ") for (name, amount) in self.counts.items()) +
+              ("" if output_size is None else ", output of " + str(output_size) + " bytes"))
+        for (name, seconds, peak) in self.stages:
+            print("\t%-24s%10.3fs%10.1fMB" % (name, seconds, peak))
+        print("\t%-24s%10.3fs" % ("total", total))
+
+        folder_path = os.path.dirname(output_path) if output_path is not None else os.path.join(os.getcwd(), HTML_FILE_FOLDER)
+        os.makedirs(folder_path, exist_ok=True)
+        record = {"time": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"), "operation": self.operation, "item_type": self.item_type,
+                  "item_name": self.item_name, "output": output_path, "output_bytes": output_size, "total_seconds": total}
+        record.update(self.counts)
+        record["stages"] = [{"name": name, "seconds": seconds, "peak_mb": peak} for (name, seconds, peak) in self.stages]
+        with open(os.path.join(folder_path, PROFILE_LOG_FILE), 'a') as f:
+            f.write(json.dumps(record) + "\n")
@@ -0,0 +1,344 @@
+"""Dependency Graph Reachability Index
+
+Answers "what depends on X", "what does X depend on" and "is there a path of dependencies from A to B"
+from an index that is built once from a module graph, instead of querying the dependencies in Specman for every question.
+The dependencies are condensed to their cycles (strongly connected components), and the transitive closure of the cycles
+is kept as a bit matrix in a NumPy array, a row per cycle with a bit for every cycle it reaches.
+Building the index takes O(V+E) steps of O(C/8) byte operations, C being the amount of cycles, and it takes C*C/8 bytes.
+A reachability query is a single bit lookup, and the sets of dependents and dependees are read from a column or a row.
+
+The index of a module graph of all of the modules is saved next to its text file (with the REACHABILITY_INDEX_EXTENSION extension)
+when REACHABILITY_INDEX is True in the config file, or by dependencies_query::reachability_index in the e file.
+The graphs of a single module have all of the modules as vertices but only some of the dependencies, so they are not indexed.
+The query functions work on the last built index, or load the newest index of all of the modules in TEXT_FILE_FOLDER.
+When the dependencies of a module change, update_index updates the index and saves it, only the closure rows
+of the cycles that reach the module are recomputed, unless a cycle is created or broken.
+
+This file is required to be in the same folder as:
+    graph_core.py
+    graph_io.py
+    backends.py
+    config.py
+
+This file contains the following classes:
+    * ReachabilityIndex - The transitive closure of the dependencies of a graph
+
+This file contains the following functions:
+    * index_graph_flat - Writes the text file of a module graph and the reachability index next to it
+    * is_reachable, get_dependents, get_dependees, get_shortest_path - Queries of the current index
+    * update_index - Replaces the dependencies of a module in the current index
+"""
+from config import *
+import graph_core as core
+import graph_io
+import backends
+
+from collections import deque
+import glob
+import os
+
+# Imported when an index is first built or loaded
+np = backends.get_backend("arrays")
+
+
+###### CONSTANTS ######
+
+INDEX_FORMAT_VERSION = 2
+FULL_SCOPES = ["*", "all"] # The item names of the module graphs of all of the modules
+
+#######################
+
+
+class ReachabilityIndex:
+    """ The transitive closure of the dependencies of a graph
+    Class attributes:
+    names - The vertex names, the id of a vertex is its index in this list
+    ids - The id of every vertex name
+    successors - The set of ids of the vertices that every vertex directly depends on
+    component - The cycle of every vertex, the cycles are numbered in reverse topological order when the index is built
+    members - The ids of the vertices of every cycle
+    reach - A bit matrix of shape (cycles, cycles/8), bit j of row i is set when cycle i reaches cycle j through dependencies
+    scope - The item name of the graph that the index was built from, one of FULL_SCOPES when it has all of the modules
+    """
+    def __init__(self, names, edges, scope=""):
+        """
+        Parameters
+        ----------
+        names : list of string
+            The vertex names
+        edges : iterable of tuple
+            The dependencies as (source id, destination id), without the unused imports
+        scope : string
+            The item name of the graph
+        """
+        self.scope = scope
+        self.names = list(names)
+        self.ids = {name: i for i, name in enumerate(self.names)}
+        self.successors = [set() for name in self.names]
+        for (src, dst) in edges:
+            if src != dst:
+                self.successors[src].add(dst)
+        self.build()
+
+    @classmethod
+    def from_graph(cls, graph, scope=""):
+        """ Builds the index of the dependencies of a DependencyGraph """
+        return cls(graph.names, graph.edges, scope)
+
+    def build(self):
+        """ Computes the cycles and the closure of all of the vertices """
+        sources = [src for src in range(len(self.names)) for dst in self.successors[src]]
+        targets = [dst for src in range(len(self.names)) for dst in self.successors[src]]
+        (offsets, sorted_targets) = core.build_csr(len(self.names), sources, targets)
+        self.component = core.strongly_connected_components(len(self.names), offsets, sorted_targets)
+        component_amount = max(self.component) + 1 if self.component else 0
+        self.members = [[] for c in range(component_amount)]
+        for (i, c) in enumerate(self.component):
+            self.members[c].append(i)
+        self.reach = np.zeros((component_amount, (component_amount + 7) // 8), dtype=np.uint8)
+        self.close_components(range(component_amount)) # Tarjan's numbering puts every cycle after the cycles it reaches
+
+    def component_successors(self, c):
+        """ Returns an array of the cycles that cycle c directly depends on """
+        return np.array(sorted({self.component[w] for v in self.members[c] for w in self.successors[v]} - {c}), dtype=np.int64)
+
+    def close_components(self, order):
+        """ Recomputes the closure rows of the cycles in order, every cycle must come after the cycles it depends on """
+        for c in order:
+            successors = self.component_successors(c)
+            row = np.bitwise_or.reduce(self.reach[successors], axis=0) if len(successors) else np.zeros(self.reach.shape[1], dtype=np.uint8)
+            np.bitwise_or.at(row, successors >> 3, (1 << (successors & 7)).astype(np.uint8))
+            self.reach[c] = row
+
+    def component_reaches(self, a, b):
+        return bool(self.reach[a, b >> 3] >> (b & 7) & 1)
+
+    def reaches(self, src, dst):
+        """ Returns True when the vertex called src depends on the vertex called dst, directly or indirectly """
+        (a, b) = (self.component[self.ids[src]], self.component[self.ids[dst]])
+        if a == b: # Vertices of the same cycle reach each other
+            return len(self.members[a]) > 1
+        return self.component_reaches(a, b)
+
+    def expand(self, components, exclude):
+        """ Returns the sorted names of the vertices of the given cycles, without the vertex id exclude """
+        return sorted(self.names[v] for c in components for v in self.members[c] if v != exclude)
+
+    def dependees(self, name):
+        """ Returns the names of the vertices that the vertex depends on, directly or indirectly """
+        i = self.ids[name]
+        c = self.component[i]
+        row = np.unpackbits(self.reach[c], bitorder="little")[:len(self.members)]
+        return self.expand(np.flatnonzero(row).tolist() + [c], i)
+
+    def dependents(self, name):
+        """ Returns the names of the vertices that depend on the vertex, directly or indirectly """
+        i = self.ids[name]
+        c = self.component[i]
+        column = self.reach[:, c >> 3] >> (c & 7) & 1
+        return self.expand(np.flatnonzero(column).tolist() + [c], i)
+
+    def shortest_path(self, src, dst):
+        """ Returns the names of the vertices of a shortest path of dependencies from src to dst, or an empty list
+        A breadth first search that only visits the vertices that reach dst.
+        """
+        if src == dst or not self.reaches(src, dst):
+            return []
+        (start, end) = (self.ids[src], self.ids[dst])
+        parent = {start: None}
+        queue = deque([start])
+        while end not in parent:
+            v = queue.popleft()
+            for w in self.successors[v]:
+                if w not in parent and (self.component[w] == self.component[end] or self.component_reaches(self.component[w], self.component[end])):
+                    parent[w] = v
+                    queue.append(w)
+        path = []
+        v = end
+        while v is not None:
+            path.append(self.names[v])
+            v = parent[v]
+        return path[::-1]
+
+    def update_module(self, name, dependee_names):
+        """ Replaces the direct dependencies of a module, and updates the closure
+        Only the rows of the cycles that reach the module are recomputed. When a new module is given, or a dependency creates
+        or breaks a cycle, the whole index is rebuilt.
+        """
+        new_names = [new_name for new_name in dict.fromkeys([name] + list(dependee_names)) if new_name not in self.ids]
+        for new_name in new_names:
+            self.ids[new_name] = len(self.names)
+            self.names.append(new_name)
+            self.successors.append(set())
+        i = self.ids[name]
+        new_successors = {self.ids[dependee] for dependee in dependee_names} - {i}
+        removed = self.successors[i] - new_successors
+        added = new_successors - self.successors[i]
+        self.successors[i] = new_successors
+        c = self.component[i] if not new_names else None
+        if new_names or any(self.component[w] == c for w in removed) or any(self.component_reaches(self.component[w], c) for w in added):
+            self.build()
+            return
+
+        if removed:
+            self.close_components(self.topological_order(self.reaching_components(c)))
+        for w in added:
+            target = self.component[w]
+            if target == c or self.component_reaches(c, target):
+                continue
+            row = self.reach[target].copy()
+            row[target >> 3] |= 1 << (target & 7)
+            affected = self.reaching_components(c)
+            self.reach[affected] |= row
+
+    def reaching_components(self, c):
+        """ Returns an array of cycle c and the cycles that reach it """
+        return np.append(np.flatnonzero(self.reach[:, c >> 3] >> (c & 7) & 1), c)
+
+    def topological_order(self, components):
+        """ Returns the given cycles ordered so every cycle comes after the cycles it depends on, with a depth first search """
+        components = set(components.tolist())
+        order = []
+        visited = set()
+        for root in components:
+            if root in visited:
+                continue
+            visited.add(root)
+            stack = [(root, iter(self.component_successors(root).tolist()))]
+            while stack:
+                (c, successors) = stack[-1]
+                for s in successors:
+                    if s in components and s not in visited:
+                        visited.add(s)
+                        stack.append((s, iter(self.component_successors(s).tolist())))
+                        break
+                else:
+                    stack.pop()
+                    order.append(c)
+        return order
+
+    def save(self, path):
+        """ Saves the index to a compressed NumPy file """
+        sources = [src for src in range(len(self.names)) for dst in self.successors[src]]
+        targets = [dst for src in range(len(self.names)) for dst in self.successors[src]]
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, version=INDEX_FORMAT_VERSION, scope=self.scope, names=np.array(self.names, dtype=str), edge_src=np.array(sources, dtype=np.int64),
+                                edge_dst=np.array(targets, dtype=np.int64), component=np.array(self.component, dtype=np.int64), reach=self.reach)
+
+    @classmethod
+    def load(cls, path):
+        """ Loads an index saved by save, without recomputing the closure """
+        with np.load(path) as data:
+            index = cls.__new__(cls)
+            index.scope = read_scope(data)
+            index.names = data["names"].tolist()
+            index.ids = {name: i for i, name in enumerate(index.names)}
+            index.successors = [set() for name in index.names]
+            for (src, dst) in zip(data["edge_src"].tolist(), data["edge_dst"].tolist()):
+                index.successors[src].add(dst)
+            index.component = data["component"].tolist()
+            index.reach = data["reach"]
+        index.members = [[] for c in range(len(index.reach))]
+        for (i, c) in enumerate(index.component):
+            index.members[c].append(i)
+        return index
+
+
+def read_scope(data):
+    """Returns the scope of a loaded index file, the indices of version 1 have no scope"""
+    return str(data["scope"]) if "scope" in data.files else ""
+
+def is_full_scope(item_name):
+    """Returns True when a module graph with the given item name has all of the modules and their dependencies"""
+    return item_name in FULL_SCOPES
+
+
+current_index = None # The index that the query functions work on, and the path it is saved to
+current_path = None
+
+def save_index(graph, text_path, item_name):
+    """Builds the index of a DependencyGraph, saves it next to its text file, makes it the current index and returns its path"""
+    global current_index, current_path
+    current_index = ReachabilityIndex.from_graph(graph, item_name)
+    current_path = graph_io.remove_extension(text_path) + REACHABILITY_INDEX_EXTENSION
+    current_index.save(current_path)
+    print("The reachability index has been written to the following path:")
+    print(current_path)
+    return current_path
+
+def get_index():
+    """Returns the current index, or None if there are no indices
+    When there is none, the newest index of all of the modules in TEXT_FILE_FOLDER is loaded.
+    An index of a single module graph is loaded only when there is no such index, with a warning.
+    """
+    global current_index, current_path
+    if current_index is None:
+        paths = glob.glob(os.path.join(os.getcwd(), TEXT_FILE_FOLDER, "*" + REACHABILITY_INDEX_EXTENSION))
+        if not paths:
+            print("No reachability index was found in", TEXT_FILE_FOLDER)
+            return None
+        full_paths = []
+        for path in paths:
+            with np.load(path) as data:
+                if is_full_scope(read_scope(data)):
+                    full_paths.append(path)
+        current_path = max(full_paths or paths, key=os.path.getmtime)
+        current_index = ReachabilityIndex.load(current_path)
+        if not full_paths:
+            print("\t*** Warning: No reachability index of all of the modules was found in", TEXT_FILE_FOLDER + ", the queries only use the dependencies in", current_path)
+            print("\t    Run dependencies_query::reachability_index to index all of the modules.")
+    return current_index
+
+def check_names(index, *names):
+    """Returns True when all of the names are in the index, and prints the missing names otherwise"""
+    missing = [name for name in names if name not in index.ids]
+    if missing:
+        print("Not in the reachability index:", ", ".join(missing))
+    return not missing
+
+def index_graph_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst, item_name):
+    """Writes the text file of a module graph, and the reachability index next to it
+    Note - This function is called from E code.
+
+    The graph parameters are the same as in create_graph.graph_to_file_flat.
+    """
+    import create_graph # create_graph imports this file
+    graph = core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst)
+    create_graph.write_graph_file(graph, item_name, "modules", reachability_index=True)
+
+def is_reachable(src, dst):
+    """Returns True when the module src depends on the module dst, directly or indirectly
+    Note - This function is called from E code.
+    """
+    index = get_index()
+    return index is not None and check_names(index, src, dst) and index.reaches(src, dst)
+
+def get_dependents(name):
+    """Returns the names of the modules that depend on the module, directly or indirectly
+    Note - This function is called from E code.
+    """
+    index = get_index()
+    return index.dependents(name) if index is not None and check_names(index, name) else []
+
+def get_dependees(name):
+    """Returns the names of the modules that the module depends on, directly or indirectly
+    Note - This function is called from E code.
+    """
+    index = get_index()
+    return index.dependees(name) if index is not None and check_names(index, name) else []
+
+def get_shortest_path(src, dst):
+    """Returns the module names of a shortest path of dependencies from src to dst, or an empty list if there is none
+    Note - This function is called from E code.
+    """
+    index = get_index()
+    return index.shortest_path(src, dst) if index is not None and check_names(index, src, dst) else []
+
+def update_index(name, dependee_names):
+    """Replaces the direct dependencies of a module in the current index, and saves it
+    Note - This function is called from E code.
+    """
+    index = get_index()
+    if index is not None:
+        index.update_module(name, dependee_names)
+        index.save(current_path)
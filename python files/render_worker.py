@@ -0,0 +1,238 @@
+"""Dependency Graph Background Worker
+
+Creates graphs in a background process, so the Specman session does not wait for the layout and the HTML file.
+The graph data is saved as a job in ASYNC_QUEUE_FOLDER, and a worker process creates the queued graphs one at a time.
+The worker exits when the queue is empty, and it is started again by the next queued graph.
+The worker output and failures are written to ASYNC_LOG_FILE in HTML_FILE_FOLDER.
+
+It is assumed that the draw_graph_async and render_status functions are called from the matching E file dependency_graph.e
+The worker itself is run as:
+    python render_worker.py <queue folder>
+
+This file is required to be in the same folder as:
+    create_graph.py
+    graph_core.py
+    config.py
+
+This file contains the following functions:
+    * draw_graph_async - Queues a graph to the background worker and returns its job id
+    * draw_graph_async_flat - The same, with the graph passed as parallel flat lists
+    * queue_graph - Queues a DependencyGraph to the background worker and returns its job id
+    * render_status - Returns the status of a queued graph
+"""
+from config import *
+import graph_core as core
+from graph_core import vertex, edge, dependency_line # The classes that correspond with the structs in the e file
+
+from datetime import datetime as datetime
+import subprocess
+import traceback
+import pickle
+import shutil
+import json
+import time
+import uuid
+import sys
+import os
+
+
+###### CONSTANTS ######
+
+JOB_EXTENSION = ".job"
+RUNNING_EXTENSION = ".running"
+STATUS_EXTENSION = ".status"
+PID_FILE_NAME = "worker.pid"
+
+#######################
+
+
+def get_queue_folder():
+    folder_path = os.path.join(os.getcwd(), ASYNC_QUEUE_FOLDER)
+    os.makedirs(folder_path, exist_ok=True)
+    return folder_path
+
+def write_status(queue_path, job_id, status, path=None, error=None, pid=None):
+    with open(os.path.join(queue_path, job_id + STATUS_EXTENSION + ".tmp"), 'w') as f:
+        json.dump({"status": status, "path": path, "error": error, "pid": pid}, f)
+    os.replace(os.path.join(queue_path, job_id + STATUS_EXTENSION + ".tmp"), os.path.join(queue_path, job_id + STATUS_EXTENSION)) # render_status only sees complete statuses
+
+def read_status(queue_path, job_id):
+    """Returns the status dictionary of a job, with a running job whose worker process no longer exists as failed"""
+    with open(os.path.join(queue_path, job_id + STATUS_EXTENSION)) as f:
+        status = json.load(f)
+    if status["status"] == "running" and status.get("pid") is not None and not is_process_running(status["pid"]):
+        status = {"status": "failed", "path": None, "error": "The worker process " + str(status["pid"]) + " exited while creating the graph", "pid": None}
+    return status
+
+def is_process_running(pid):
+    try:
+        os.kill(pid, 0) # Checks that the process exists, without sending a signal
+        return True
+    except OSError:
+        return False
+
+def is_worker_running(queue_path):
+    try:
+        with open(os.path.join(queue_path, PID_FILE_NAME)) as f:
+            pid = int(f.read())
+    except (OSError, ValueError):
+        return False
+    return is_process_running(pid)
+
+def start_worker(queue_path):
+    html_folder_path = os.path.join(os.getcwd(), HTML_FILE_FOLDER)
+    os.makedirs(html_folder_path, exist_ok=True)
+    python_path = shutil.which(ASYNC_WORKER_PYTHON) or ASYNC_WORKER_PYTHON
+    with open(os.path.join(html_folder_path, ASYNC_LOG_FILE), 'a') as log_file:
+        process = subprocess.Popen([python_path, os.path.abspath(__file__), queue_path], cwd=os.getcwd(), close_fds=True,
+                                   stdin=subprocess.DEVNULL, stdout=log_file, stderr=subprocess.STDOUT, start_new_session=True)
+    with open(os.path.join(queue_path, PID_FILE_NAME), 'w') as f: # Written before the worker starts, so a single worker is started
+        f.write(str(process.pid))
+
+
+def draw_graph_async(vertices, edges, imported, item_name, item_type, blacklist=[], focus_hops=0):
+    """Queues the graph to the background worker, and returns immediately
+    Note - This function is called from E code.
+
+    The parameters are the same as in create_graph.draw_graph.
+    The vertices and edges are copied to plain lists, so the E objects are not used after the function returns.
+
+    Returns
+    -------
+    string
+        The job id, to be passed to render_status
+    """
+    return queue_graph(core.DependencyGraph.from_objects(vertices, edges, imported), item_name, item_type, blacklist, focus_hops)
+
+def draw_graph_async_flat(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst, item_name, item_type, blacklist=[], focus_hops=0):
+    """Queues the graph to the background worker from parallel flat lists, and returns the job id
+    Note - This function is called from E code.
+
+    The parameters are the same as in create_graph.draw_graph_flat.
+    """
+    return queue_graph(core.DependencyGraph.from_columns(names, pkgs, edge_src, edge_dst, line_offsets, lines, import_src, import_dst), item_name, item_type, blacklist, focus_hops)
+
+def queue_graph(graph, item_name, item_type, blacklist=[], focus_hops=0):
+    """Queues a DependencyGraph to the background worker, and returns the job id"""
+    job = {"names": graph.names,
+           "pkgs": graph.pkgs,
+           "edges": graph.edges,
+           "lines": graph.lines,
+           "imports": graph.imports,
+           "item_name": item_name,
+           "item_type": item_type,
+           "blacklist": list(blacklist),
+           "focus_hops": focus_hops}
+    queue_path = get_queue_folder()
+    job_id = datetime.now().strftime("%Y_%m_%d_%H_%M_%S") + "-" + uuid.uuid4().hex[:8] # Jobs are created in the order of their ids
+    write_status(queue_path, job_id, "queued")
+    with open(os.path.join(queue_path, job_id + JOB_EXTENSION + ".tmp"), 'wb') as f:
+        pickle.dump(job, f, pickle.HIGHEST_PROTOCOL)
+    os.replace(os.path.join(queue_path, job_id + JOB_EXTENSION + ".tmp"), os.path.join(queue_path, job_id + JOB_EXTENSION)) # The worker only sees complete jobs
+
+    if not is_worker_running(queue_path):
+        start_worker(queue_path)
+    print("The graph is created in the background, job id:", job_id)
+    return job_id
+
+def render_status(job_id):
+    """Returns the status of a graph that was queued by draw_graph_async
+    Note - This function is called from E code.
+
+    Returns
+    -------
+    string
+        One of "queued", "running", "done <html file path>", "failed <error>" or "unknown"
+        A running job whose worker process no longer exists is reported as failed.
+    """
+    try:
+        status = read_status(get_queue_folder(), job_id)
+    except (OSError, ValueError):
+        return "unknown"
+    if status["status"] == "done":
+        return "done " + status["path"]
+    if status["status"] == "failed":
+        return "failed " + status["error"] + " (see " + os.path.join(HTML_FILE_FOLDER, ASYNC_LOG_FILE) + ")"
+    return status["status"]
+
+
+def run_job(queue_path, job_id):
+    running_path = os.path.join(queue_path, job_id + RUNNING_EXTENSION)
+    print(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Started job", job_id, flush=True)
+    try:
+        write_status(queue_path, job_id, "running", pid=os.getpid())
+        import create_graph # Inside the try, so a missing plotting package fails the job instead of the worker
+
+        with open(running_path, 'rb') as f:
+            job = pickle.load(f)
+        graph = core.DependencyGraph(job["names"], job["pkgs"], job["edges"], job["lines"], job["imports"])
+        graph_filename = create_graph.render_graph(graph, job["item_name"], job["item_type"], job["blacklist"], open_browser=ASYNC_OPEN_BROWSER,
+                                                    focus_hops=job.get("focus_hops", 0))
+        if graph_filename is None:
+            write_status(queue_path, job_id, "failed", error="The graph was not created")
+        else:
+            write_status(queue_path, job_id, "done", path=graph_filename)
+    except Exception as error:
+        traceback.print_exc()
+        write_status(queue_path, job_id, "failed", error=repr(error))
+    finally:
+        try:
+            os.remove(running_path)
+        except OSError:
+            pass
+    print(datetime.now().strftime("%Y-%m-%d %H:%M:%S"), "Finished job", job_id, flush=True)
+
+def remove_pid_file(pid_path):
+    try:
+        with open(pid_path) as f:
+            is_own_pid = f.read() == str(os.getpid())
+        if is_own_pid:
+            os.remove(pid_path)
+    except OSError:
+        pass
+
+def remove_old_files(queue_path):
+    """Removes the statuses older than ASYNC_STATUS_MAX_AGE, and the jobs left running by a worker that exited"""
+    oldest_time = time.time() - ASYNC_STATUS_MAX_AGE * 60 * 60
+    for file_name in os.listdir(queue_path):
+        file_path = os.path.join(queue_path, file_name)
+        try:
+            if file_name.endswith(STATUS_EXTENSION) and os.path.getmtime(file_path) < oldest_time:
+                os.remove(file_path)
+            elif file_name.endswith(RUNNING_EXTENSION):
+                job_id = file_name[:-len(RUNNING_EXTENSION)]
+                status = read_status(queue_path, job_id)
+                if status["status"] == "failed": # The job of an exited worker, it is not created again
+                    write_status(queue_path, job_id, "failed", error=status["error"])
+                    os.remove(file_path)
+        except (OSError, ValueError): # The file was removed by another worker
+            pass
+
+def run_worker(queue_path):
+    """Creates the queued graphs in the order they were queued, until the queue is empty"""
+    pid_path = os.path.join(queue_path, PID_FILE_NAME)
+    while True:
+        with open(pid_path, 'w') as f:
+            f.write(str(os.getpid()))
+        remove_old_files(queue_path)
+        while True:
+            jobs = sorted(f for f in os.listdir(queue_path) if f.endswith(JOB_EXTENSION))
+            if not jobs:
+                break
+            job_id = jobs[0][:-len(JOB_EXTENSION)]
+            try:
+                os.rename(os.path.join(queue_path, jobs[0]), os.path.join(queue_path, job_id + RUNNING_EXTENSION))
+            except OSError: # The job was taken by another worker
+                continue
+            run_job(queue_path, job_id)
+        remove_pid_file(pid_path)
+        # A job may have been queued after the last check, while the worker still seemed to be running
+        if not any(f.endswith(JOB_EXTENSION) for f in os.listdir(queue_path)):
+            break
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Usage: python render_worker.py <queue folder>")
+        sys.exit(1)
+    run_worker(sys.argv[1])